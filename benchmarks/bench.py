@@ -0,0 +1,241 @@
+'''
+SDK benchmarks against the local MockLighterServer, no network or exchange account needed.
+
+    python -m benchmarks.bench                      #all benchmarks
+    python -m benchmarks.bench order_rate decode    #a selection
+    python -m benchmarks.bench --latency 0.005 --json results.json
+
+By default the server shares the event loop (and core) with the client. For client-only numbers run
+it in its own process, `python -m benchmarks.mock_server --port 8000`, and pass `--url http://127.0.0.1:8000`.
+
+Signing uses NullSigner, so order benchmarks measure SDK overhead (legs, nonces, encoding, HTTP)
+without the native signer. Assign a real SignerClient to `lighter.client` to include it.
+'''
+import time
+import asyncio
+import logging
+import argparse
+import orjson
+
+from benchmarks.mock_server import MockLighterServer
+from lighter_sdk.httpx import HTTPClient, RetryPolicy
+from lighter_sdk.metrics import LatencyRecorder
+from lighter_sdk.lighter import Lighter
+
+class NullSigner:
+    '''stands in for SignerClient, "signs" by serializing the order fields'''
+    account_index = 1
+    api_key_index = 0
+
+    def _sign(self, nonce, **kwargs):
+        return orjson.dumps({
+            'AccountIndex': self.account_index,
+            'ApiKeyIndex': self.api_key_index,
+            'Nonce': nonce,
+            **kwargs
+        }).decode(), None
+
+    sign_create_order = _sign
+    sign_cancel_order = _sign
+    sign_modify_order = _sign
+    sign_cancel_all_orders = _sign
+
+    def create_auth_token_with_expiry(self, deadline):
+        return f'auth:{deadline}', None
+
+    async def close(self):
+        pass
+
+
+async def make_client(url, **http_kwargs):
+    lighter = Lighter(
+        key='0x0',
+        http_client=HTTPClient(base_url=url, metrics=LatencyRecorder(), **http_kwargs),
+        account_idx=NullSigner.account_index
+    )
+    lighter.client = NullSigner()
+    lighter.auth.register(lighter.client.account_index, lighter.client.api_key_index, lighter.client)
+    lighter._set_markets((await lighter.orderbooks())['order_books'])
+    lighter.http_client.metrics.reset()
+    return lighter
+
+
+def stage_summary(lighter, endpoint):
+    stages = lighter.http_client.metrics.snapshot().get(endpoint, {}).get('stages', {})
+    return {stage: {k: round(v * 1e3, 3) for k, v in s.items() if k != 'count'} for stage, s in stages.items()}
+
+
+async def bench_order_rate(server, n=2000, concurrency=50):
+    '''limit orders through sendTx with `concurrency` in flight, then the same orders through sendTxBatch'''
+    lighter = await make_client(server.url)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def place(i):
+        async with semaphore:
+            await lighter.limit_order(ticker='M0', amount=0.1, price=100 + i % 50 / 100, client_order_index=i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[place(i) for i in range(n)])
+    single = time.perf_counter() - start
+
+    orders = [{'ticker': 'M0', 'amount': 0.1, 'price': 100 + i % 50 / 100, 'client_order_index': i} for i in range(n)]
+    start = time.perf_counter()
+    await lighter.batch_orders(orders)
+    batched = time.perf_counter() - start
+    result = {
+        'orders': n,
+        'send_tx_per_s': round(n / single),
+        'send_tx_batch_per_s': round(n / batched),
+        'send_tx_ms': stage_summary(lighter, '/api/v1/sendTx'),
+    }
+    await lighter.http_client.cleanup()
+    return result
+
+
+async def bench_fanout(server, requests=1000, concurrency=100):
+    '''concurrent orderbook_orders requests spread over every market'''
+    lighter = await make_client(server.url)
+    semaphore = asyncio.Semaphore(concurrency)
+    markets = [instrument.market_id for instrument in lighter.instruments]
+
+    async def fetch(i):
+        async with semaphore:
+            await lighter.orderbook_orders(markets[i % len(markets)], limit=20, is_index=True)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(i) for i in range(requests)])
+    elapsed = time.perf_counter() - start
+    result = {
+        'requests': requests,
+        'concurrency': concurrency,
+        'requests_per_s': round(requests / elapsed),
+        'latency_ms': stage_summary(lighter, '/api/v1/orderBookOrders'),
+    }
+    await lighter.http_client.cleanup()
+    return result
+
+
+async def bench_decode(server, levels=5000, bars=5000, rounds=20):
+    '''decode cost of large orderbook_orders and candlesticks payloads, as dicts and as columns (dicts plus the column pass)'''
+    lighter = await make_client(server.url)
+    result = {}
+    for name, fetch in (
+        ('orderbook_orders', lambda columnar: lighter.orderbook_orders(0, limit=levels, is_index=True, columnar=columnar)),
+        ('candlesticks', lambda columnar: lighter.candlesticks(0, count_back=bars, is_index=True, columnar=columnar)),
+    ):
+        for columnar in (False, True):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                await fetch(columnar)
+            result[f'{name}{"_columnar" if columnar else ""}_ms'] = round((time.perf_counter() - start) / rounds * 1e3, 3)
+    snapshot = lighter.http_client.metrics.snapshot()
+    result['json_decode_ms'] = {
+        endpoint: round(entry['stages']['decode']['mean'] * 1e3, 3) for endpoint, entry in snapshot.items()
+    }
+    await lighter.http_client.cleanup()
+    return result
+
+
+async def bench_retry(server, requests=500, error_rate=0.2):
+    '''GETs against injected 503s, with the default retry policy'''
+    server.error_rate = {'*': error_rate}
+    lighter = await make_client(server.url, retry_policy=RetryPolicy(backoff=0.005))
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[lighter.orderbook_orders(0, limit=10, is_index=True) for _ in range(requests)],
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    server.error_rate = {'*': 0}
+    entry = lighter.http_client.metrics.snapshot().get('/api/v1/orderBookOrders', {})
+    result = {
+        'requests': requests,
+        'error_rate': error_rate,
+        'succeeded': sum(not isinstance(r, Exception) for r in results),
+        'retries': entry.get('retries', 0),
+        'errors': entry.get('errors', 0),
+        'elapsed_s': round(elapsed, 3),
+    }
+    await lighter.http_client.cleanup()
+    return result
+
+
+async def bench_failover(server, requests=200, hedge=90):
+    '''GETs over three hosts: this server, a slow one and a failing one; then this server starts failing'''
+    slow = MockLighterServer(latency=0.05, jitter=0.05)
+    failing = MockLighterServer(error_rate=1.)
+    urls = [await slow.start(), await failing.start(), server.url]
+    result = {}
+    try:
+        for phase in ('healthy', 'failed_over'):
+            server.error_rate = {'*': 1. if phase == 'failed_over' else 0}
+            lighter = await make_client(urls, retry_policy=RetryPolicy(backoff=0.005), hedge=hedge)
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                await lighter.orderbook_orders(0, limit=10, is_index=True)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            hosts = lighter.http_client.hosts
+            result[phase] = {
+                'p50_ms': round(latencies[len(latencies) // 2] * 1e3, 3),
+                'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1e3, 3),
+                'requests': {name: hosts.requests[url] for name, url in zip(('slow', 'failing', 'server'), urls)},
+                'hedged': hosts.hedged,
+            }
+            await lighter.http_client.cleanup()
+    finally:
+        server.error_rate = {'*': 0}
+        await slow.close()
+        await failing.close()
+    return result
+
+
+BENCHMARKS = {
+    'order_rate': bench_order_rate,
+    'fanout': bench_fanout,
+    'decode': bench_decode,
+    'retry': bench_retry,
+    'failover': bench_failover,
+}
+
+class RemoteServer:
+    '''a mock server running elsewhere, only its url is known'''
+    def __init__(self, url):
+        self.url = url
+
+
+async def main(names, latency=0., jitter=0., url=None):
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    server = RemoteServer(url) if url else MockLighterServer(latency=latency, jitter=jitter)
+    if not url:
+        await server.start()
+    results = {}
+    try:
+        for name in names:
+            if url and name in ('retry', 'failover'):
+                print(f'{name} skipped, error injection needs the in-process server')
+                continue
+            results[name] = await BENCHMARKS[name](server)
+            print(name, orjson.dumps(results[name], option=orjson.OPT_INDENT_2).decode())
+    finally:
+        if not url:
+            await server.close()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', help=f'benchmarks to run, of {", ".join(BENCHMARKS)}')
+    parser.add_argument('--latency', type=float, default=0., help='seconds of server latency per request')
+    parser.add_argument('--jitter', type=float, default=0., help='seconds of uniform extra latency')
+    parser.add_argument('--url', help='a mock server started separately, instead of an in-process one')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks {", ".join(sorted(unknown))}')
+    results = asyncio.run(main(args.names or list(BENCHMARKS), latency=args.latency, jitter=args.jitter, url=args.url))
+    if args.json:
+        with open(args.json, 'wb') as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
@@ -0,0 +1,288 @@
+import time
+import random
+import asyncio
+import orjson
+
+from urllib.parse import urlsplit, parse_qs
+
+class MockLighterServer:
+    """
+    A local stand-in for the Lighter REST API, serving synthetic but well-formed responses for every
+    endpoint of `lighter_sdk.lighter.endpoints` over plain HTTP/1.1 keepalive connections. Latency and
+    errors can be injected globally or per endpoint, and `sendTx`/`sendTxBatch` reject reused nonces.
+
+    Args:
+        latency (float or dict, optional): Seconds added to every response, or endpoint -> seconds ('*' for the rest). Defaults to 0.
+        jitter (float, optional): Uniform extra latency in seconds, up to this value. Defaults to 0.
+        error_rate (float or dict, optional): Probability of an injected error, or endpoint -> probability. Defaults to 0.
+        error_status (int, optional): The status code of injected errors. Defaults to 503.
+        retry_after (float, optional): A Retry-After header (s) sent with injected errors. Defaults to None.
+        markets (int, optional): The number of synthetic markets. Defaults to 8.
+        check_nonces (bool, optional): Whether to reject transactions reusing a nonce. Defaults to True.
+        seed (int, optional): The seed of the latency and error draws. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        latency=0,
+        jitter=0,
+        error_rate=0,
+        error_status=503,
+        retry_after=None,
+        markets=8,
+        check_nonces=True,
+        seed=0
+    ):
+        self.latency = latency if isinstance(latency, dict) else {'*': latency}
+        self.jitter = jitter
+        self.error_rate = error_rate if isinstance(error_rate, dict) else {'*': error_rate}
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.markets = markets
+        self.check_nonces = check_nonces
+        self.random = random.Random(seed)
+        self.nonces = {}
+        self.used = {}
+        self.height = 1000
+        self.requests = {}
+        self.errors = {}
+        self.server = None
+        self.routes = {
+            '/': self.status,
+            '/info': self.info,
+            '/api/v1/orderBooks': self.orderbooks,
+            '/api/v1/orderBookDetails': self.orderbooks,
+            '/api/v1/orderBookOrders': self.orderbook_orders,
+            '/api/v1/recentTrades': self.trades,
+            '/api/v1/trades': self.trades,
+            '/api/v1/candlesticks': self.candlesticks,
+            '/api/v1/fundings': self.fundings,
+            '/api/v1/nextNonce': self.next_nonce,
+            '/api/v1/sendTx': self.send_tx,
+            '/api/v1/sendTxBatch': self.send_tx_batch,
+            '/api/v1/accountsByL1Address': self.accounts_by_l1_address,
+            '/api/v1/account': self.account,
+            '/api/v1/accountActiveOrders': self.active_orders,
+            '/api/v1/accountInactiveOrders': self.active_orders,
+            '/api/v1/accountOrders': self.active_orders,
+            '/api/v1/blocks': self.blocks,
+            '/api/v1/block': self.block,
+            '/api/v1/blockTxs': self.block_txs,
+            '/api/v1/currentHeight': lambda params, form: {'code': 200, 'height': self.height},
+        }
+
+    @property
+    def url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f'http://{host}:{port}'
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.server = await asyncio.start_server(self.serve, host, port)
+        return self.url
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode().split(' ', 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = header.decode().split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, extra, payload = await self.respond(method, target, body)
+                writer.write(
+                    f'HTTP/1.1 {status} X\r\ncontent-type: application/json\r\ncontent-length: {len(payload)}\r\n'.encode()
+                    + b''.join(f'{k}: {v}\r\n'.encode() for k, v in extra.items()) + b'\r\n' + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, body):
+        parts = urlsplit(target)
+        path = parts.path
+        self.requests[path] = self.requests.get(path, 0) + 1
+        delay = self.latency.get(path, self.latency.get('*', 0)) + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.error_rate.get(path, self.error_rate.get('*', 0)):
+            self.errors[path] = self.errors.get(path, 0) + 1
+            extra = {'retry-after': self.retry_after} if self.retry_after is not None else {}
+            return self.error_status, extra, orjson.dumps({'code': self.error_status, 'message': 'injected error'})
+        params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        form = {k: v[-1] for k, v in parse_qs(body.decode()).items()} if body else {}
+        route = self.routes.get(path)
+        if route is None:
+            return 200, {}, orjson.dumps({'code': 200})
+        res = route(params, form)
+        status = 400 if res.get('code', 200) != 200 else 200
+        return status, {}, orjson.dumps(res)
+
+    def status(self, params, form):
+        return {'status': 200, 'network_id': 1, 'timestamp': int(time.time())}
+
+    def info(self, params, form):
+        return {'contract_address': '0x0'}
+
+    def orderbooks(self, params, form):
+        markets = range(self.markets)
+        if 'market_id' in params:
+            markets = [int(params['market_id'])]
+        return {'code': 200, 'order_books': [{
+            'symbol': f'M{i}',
+            'market_id': i,
+            'status': 'active',
+            'supported_price_decimals': 2,
+            'supported_size_decimals': 4,
+            'min_base_amount': '0.0010',
+            'min_quote_amount': '10.000000',
+        } for i in markets]}
+
+    def orderbook_orders(self, params, form):
+        limit = int(params.get('limit', 100))
+
+        def side(sign):
+            return [{
+                'order_index': 1000 * sign + i,
+                'order_id': str(1000 * sign + i),
+                'owner_account_index': i,
+                'initial_base_amount': '1.0000',
+                'remaining_base_amount': f'{1 + i % 7 / 10:.4f}',
+                'price': f'{100 + sign * (0.01 + i / 100):.2f}',
+                'order_expiry': 0,
+            } for i in range(limit)]
+
+        return {'code': 200, 'total_asks': limit, 'asks': side(1), 'total_bids': limit, 'bids': side(-1)}
+
+    def trades(self, params, form):
+        limit = int(params.get('limit', 100))
+        now = int(time.time() * 1000)
+        return {'code': 200, 'trades': [{
+            'trade_id': i,
+            'tx_hash': f'{i:064x}',
+            'type': 'trade',
+            'market_id': int(params.get('market_id', 0)),
+            'size': '0.1000',
+            'price': f'{100 + i % 10 / 100:.2f}',
+            'usd_amount': '10.00',
+            'is_maker_ask': bool(i % 2),
+            'block_height': self.height - i,
+            'timestamp': now - i * 100,
+        } for i in range(limit)]}
+
+    def _bars(self, params):
+        step = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '4h': 14400, '1d': 86400}.get(params.get('resolution', '1h'), 3600)
+        end = int(params.get('end_timestamp', time.time()))
+        count = int(params.get('count_back', 2))
+        return [(end - end % step - (count - 1 - i) * step) * 1000 for i in range(count)]
+
+    def candlesticks(self, params, form):
+        return {'code': 200, 'resolution': params.get('resolution', '1h'), 'candlesticks': [{
+            'timestamp': ts,
+            'open': 100.0 + i % 13,
+            'high': 101.0 + i % 13,
+            'low': 99.0 + i % 13,
+            'close': 100.5 + i % 13,
+            'volume0': 12.5,
+            'volume1': 1250.0,
+            'last_trade_id': i,
+        } for i, ts in enumerate(self._bars(params))]}
+
+    def fundings(self, params, form):
+        return {'code': 200, 'resolution': params.get('resolution', '1h'), 'fundings': [{
+            'timestamp': ts // 1000,
+            'value': '0.0001',
+            'rate': '0.0012',
+            'direction': 'long' if i % 2 else 'short',
+        } for i, ts in enumerate(self._bars(params))]}
+
+    def next_nonce(self, params, form):
+        key = (int(params.get('account_index', 0)), int(params.get('api_key_index', 0)))
+        return {'code': 200, 'nonce': self.nonces.setdefault(key, 1)}
+
+    def _accept(self, tx_info):
+        '''checks the nonce of a signed transaction, returns an error message or None'''
+        tx = orjson.loads(tx_info)
+        nonce = tx.get('Nonce', tx.get('nonce'))
+        if not self.check_nonces or nonce is None:
+            return None
+        key = (int(tx.get('AccountIndex', tx.get('account_index', 0))), int(tx.get('ApiKeyIndex', tx.get('api_key_index', 0))))
+        used = self.used.setdefault(key, set())
+        if nonce < 1 or nonce in used:
+            return f'invalid nonce {nonce}'
+        used.add(nonce)
+        self.nonces[key] = max(self.nonces.get(key, 1), nonce + 1)
+        return None
+
+    def send_tx(self, params, form):
+        err = self._accept(form.get('tx_info', '{}'))
+        if err:
+            return {'code': 21104, 'message': err}
+        self.height += 1
+        return {'code': 200, 'tx_hash': f'{self.random.getrandbits(256):064x}'}
+
+    def send_tx_batch(self, params, form):
+        tx_infos = orjson.loads(form.get('tx_infos', '[]'))
+        hashes = []
+        for tx_info in tx_infos:
+            err = self._accept(tx_info)
+            if err:
+                return {'code': 21104, 'message': err}
+            hashes.append(f'{self.random.getrandbits(256):064x}')
+        self.height += 1
+        return {'code': 200, 'tx_hash': hashes}
+
+    def accounts_by_l1_address(self, params, form):
+        return {'code': 200, 'l1_address': params.get('l1_address'), 'sub_accounts': [{'index': 1, 'l1_address': params.get('l1_address')}]}
+
+    def account(self, params, form):
+        return {'code': 200, 'total': 1, 'accounts': [{'index': int(params.get('value', 1)) if params.get('by') == 'index' else 1, 'positions': []}]}
+
+    def active_orders(self, params, form):
+        return {'code': 200, 'orders': []}
+
+    def blocks(self, params, form):
+        limit = int(params.get('limit', 100))
+        start = int(params.get('index', 1))
+        heights = range(start, min(start + limit, self.height + 1))
+        return {'code': 200, 'total': len(heights), 'blocks': [{'height': h, 'commitment': f'{h:064x}', 'timestamp': h * 1000} for h in heights]}
+
+    def block(self, params, form):
+        height = int(params.get('value', self.height))
+        return {'code': 200, 'total': 1, 'blocks': [{'height': height, 'commitment': f'{height:064x}', 'timestamp': height * 1000}]}
+
+    def block_txs(self, params, form):
+        height = int(params.get('value', self.height))
+        return {'code': 200, 'total': 2, 'txs': [{'hash': f'{height:032x}{i:032x}', 'block_height': height, 'type': 14} for i in range(2)]}
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve the mock Lighter API, e.g. in its own process for `bench --url`.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.)
+    parser.add_argument('--jitter', type=float, default=0.)
+    parser.add_argument('--error-rate', type=float, default=0.)
+    args = parser.parse_args()
+
+    async def main():
+        server = MockLighterServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+        print(f'serving on {await server.start(args.host, args.port)}')
+        await server.server.serve_forever()
+
+    asyncio.run(main())
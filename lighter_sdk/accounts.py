@@ -0,0 +1,91 @@
+import asyncio
+
+from lighter_sdk.httpx import HTTPClient
+from lighter_sdk.cache import ResponseCache
+from lighter_sdk.auth import AuthTokenProvider
+from lighter_sdk.instruments import InstrumentTable
+from lighter_sdk.lighter import Lighter, BASE_URL
+
+class AccountManager:
+    """
+    A front-end for many accounts of one L1 address. Every account gets its own `Lighter` (signer, nonces,
+    local state), while the connection pool, the response cache, the instrument table and the auth token
+    refresher are shared, so sockets, memory and startup cost grow only with the signers themselves.
+
+    Args:
+        key (str): The L1 address owning the accounts.
+        accounts (list): One dict per account, {'secret', 'account_idx', 'api_key_index' (optional, default 0)}.
+        http_client (HTTPClient, optional): The shared client. Defaults to HTTPClient(base_url=BASE_URL).
+        cache (bool or ResponseCache, optional): The shared metadata cache. Defaults to True.
+    """
+
+    def __init__(self, key, accounts, http_client=None, cache=True):
+        self.http_client = http_client or HTTPClient(base_url=BASE_URL)
+        if cache:
+            self.http_client.cache = cache if isinstance(cache, ResponseCache) else ResponseCache()
+        self.instruments = InstrumentTable()
+        self.auth = AuthTokenProvider()
+        self.accounts = {
+            account['account_idx']: Lighter(
+                key=key,
+                secret=account['secret'],
+                http_client=self.http_client,
+                account_idx=account['account_idx'],
+                api_key_index=account.get('api_key_index', 0),
+                instruments=self.instruments,
+                auth=self.auth
+            ) for account in accounts
+        }
+
+    async def init_client(self, snapshot_path=None):
+        """Initializes every account concurrently; the market metadata is fetched once, by the first."""
+        lighters = list(self.accounts.values())
+        await asyncio.gather(
+            lighters[0].init_client(snapshot_path=snapshot_path),
+            *[lighter.init_client(load_markets=False) for lighter in lighters[1:]]
+        )
+
+    def __getitem__(self, account_idx):
+        return self.accounts[account_idx]
+
+    def __iter__(self):
+        return iter(self.accounts.values())
+
+    def __len__(self):
+        return len(self.accounts)
+
+    async def fan_out(self, fn, account_idxs=None, concurrency=None):
+        """
+        Runs an operation on many accounts concurrently. A failing account does not cancel the others.
+
+        Args:
+            fn (callable): A coroutine function taking a `Lighter`, e.g. `lambda lighter: lighter.cancel_all_orders()`.
+            account_idxs (list, optional): The accounts to run on. Defaults to all.
+            concurrency (int, optional): The maximum number of accounts in flight. Defaults to unbounded.
+
+        Returns:
+            dict: account_idx -> result, or the raised exception.
+        """
+        account_idxs = list(self.accounts) if account_idxs is None else account_idxs
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def run(account_idx):
+            if semaphore is None:
+                return await fn(self.accounts[account_idx])
+            async with semaphore:
+                return await fn(self.accounts[account_idx])
+
+        results = await asyncio.gather(*[run(idx) for idx in account_idxs], return_exceptions=True)
+        return dict(zip(account_idxs, results))
+
+    async def cancel_all(self, account_idxs=None, concurrency=None):
+        return await self.fan_out(
+            lambda lighter: lighter.cancel_all_orders(),
+            account_idxs=account_idxs,
+            concurrency=concurrency
+        )
+
+    async def cleanup(self):
+        await asyncio.gather(*[lighter.cleanup(close_shared=False) for lighter in self.accounts.values()])
+        await self.auth.close()
+        await self.http_client.cleanup()
@@ -0,0 +1,68 @@
+import time
+import asyncio
+import logging
+
+class AuthTokenProvider:
+    """
+    Caches auth tokens per (account_index, api_key_index) and refreshes them in the background
+    before they expire, so authenticated reads never sign in the hot path.
+
+    Args:
+        lifetime (float, optional): Seconds a token is requested to be valid for. Defaults to 600.
+        refresh_margin (float, optional): Seconds before expiry a token is replaced. Defaults to 60.
+    """
+
+    def __init__(self, lifetime=600, refresh_margin=60):
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.signers = {}
+        self.tokens = {}
+        self.created = 0
+        self.task = None
+
+    def register(self, account_index, api_key_index, signer):
+        """
+        Args:
+            signer (SignerClient): The signer whose `create_auth_token_with_expiry` mints tokens for the key.
+        """
+        self.signers[(account_index, api_key_index)] = signer
+
+    def _create(self, key):
+        deadline = int(time.time() + self.lifetime)
+        token = self.signers[key].create_auth_token_with_expiry(deadline)
+        if isinstance(token, tuple):
+            token, err = token
+            if err:
+                raise ValueError(err)
+        self.tokens[key] = (token, deadline)
+        self.created += 1
+        return token
+
+    def get(self, account_index, api_key_index):
+        key = (account_index, api_key_index)
+        cached = self.tokens.get(key)
+        if cached is not None and cached[1] - time.time() > self.refresh_margin:
+            return cached[0]
+        return self._create(key)
+
+    async def run(self):
+        while True:
+            now = time.time()
+            due = min((deadline for _, deadline in self.tokens.values()), default=now + self.lifetime)
+            await asyncio.sleep(max(0, due - self.refresh_margin - now - 1))
+            for key, (_, deadline) in list(self.tokens.items()):
+                if deadline - time.time() <= self.refresh_margin + 1:
+                    try:
+                        await asyncio.to_thread(self._create, key)
+                    except Exception as e:
+                        logging.warning(f"auth token refresh failed for {key}: {e}")
+                        await asyncio.sleep(1)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
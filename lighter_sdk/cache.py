@@ -0,0 +1,95 @@
+import time
+import asyncio
+
+from collections import OrderedDict
+
+#endpoint -> seconds a response stays fresh. endpoints not listed are never cached.
+DEFAULT_TTLS = {
+    '/': 5,
+    '/info': 60,
+    '/api/v1/orderBooks': 60,
+    '/api/v1/orderBookDetails': 5,
+    '/api/v1/exchangeStats': 5,
+    '/api/v1/layer2BasicInfo': 60,
+    '/api/v1/announcement': 60,
+}
+
+class ResponseCache:
+    """
+    An LRU response cache with per-endpoint TTLs and single-flight coalescing: concurrent identical
+    requests share one in-flight call. Cached responses are shared between callers and must be
+    treated as read-only.
+
+    Args:
+        ttls (dict, optional): Overrides of `DEFAULT_TTLS`, endpoint -> seconds. A TTL of 0 disables caching for that endpoint. Defaults to None.
+        maxsize (int, optional): The maximum number of cached responses. Defaults to 1024.
+    """
+
+    def __init__(self, ttls=None, maxsize=1024):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def ttl(self, endpoint):
+        return self.ttls.get(endpoint, 0)
+
+    @staticmethod
+    def key(endpoint, params):
+        if not params:
+            return (endpoint, None)
+        if isinstance(params, str):
+            return (endpoint, params)
+        return (endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+    async def get(self, endpoint, params, fetch):
+        """
+        Return a fresh cached response for `endpoint` and `params`, joining an identical in-flight
+        request if there is one, and otherwise awaiting `fetch()` and caching its result. The fetch
+        runs as its own task: a cancelled caller stops waiting, while the fetch completes for the
+        other callers and fills the cache.
+        """
+        key = self.key(endpoint, params)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        inflight = self.inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            inflight = self.inflight[key] = asyncio.ensure_future(self._fetch(key, endpoint, fetch))
+            inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(inflight)
+
+    async def _fetch(self, key, endpoint, fetch):
+        '''the shared request, a task of its own so that cancelled callers never cancel it for the others'''
+        try:
+            value = await fetch()
+        finally:
+            del self.inflight[key]
+        self.entries[key] = (time.monotonic() + self.ttl(endpoint), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, endpoint=None):
+        if endpoint is None:
+            self.entries.clear()
+            return
+        for key in [key for key in self.entries if key[0] == endpoint]:
+            del self.entries[key]
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'size': len(self.entries),
+        }
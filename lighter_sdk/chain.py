@@ -0,0 +1,153 @@
+import os
+import time
+import asyncio
+import logging
+
+#block headers requested per call
+PAGE_BLOCKS = 100
+
+class ChainFollower:
+    """
+    Follows the chain from a start height: block headers are fetched a page at a time, their
+    transactions with up to `concurrency` requests in flight, and blocks are delivered strictly in
+    height order through async iteration. The last processed height is checkpointed to disk, so a
+    restarted follower resumes right after it and catches up at full parallelism.
+
+    A block counts as processed once the caller asks for the next one. Use it as an async context
+    manager (or call `close`) so the final checkpoint is written when the loop is left early.
+
+    Args:
+        lighter (Lighter): The client, only public endpoints are used.
+        checkpoint_path (str, optional): The file holding the last processed height. Defaults to None (no checkpoint).
+        start (int, optional): The first height when there is no checkpoint. Defaults to the current height.
+        concurrency (int, optional): The maximum number of blocks fetched ahead of the caller. Defaults to 16.
+        with_txs (bool, optional): Whether to fetch each block's transactions. Defaults to True.
+        poll_interval (float, optional): Seconds between height polls once caught up, and between retries. Defaults to 1.
+        checkpoint_interval (float, optional): The minimum seconds between checkpoint writes. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        lighter,
+        checkpoint_path=None,
+        start=None,
+        concurrency=16,
+        with_txs=True,
+        poll_interval=1,
+        checkpoint_interval=1
+    ):
+        self.lighter = lighter
+        self.checkpoint_path = checkpoint_path
+        self.start = start
+        self.concurrency = concurrency
+        self.with_txs = with_txs
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.height = self.load_checkpoint()
+        self.tip = None
+        self.checkpointed = self.height
+        self.last_write = 0
+        self.generator = None
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path:
+            return None
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def checkpoint(self, force=False):
+        if not self.checkpoint_path or self.height is None or self.height == self.checkpointed:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_write < self.checkpoint_interval:
+            return
+        tmp = f'{self.checkpoint_path}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(self.height))
+        os.replace(tmp, self.checkpoint_path)
+        self.checkpointed = self.height
+        self.last_write = now
+
+    async def current_height(self):
+        self.tip = int((await self.lighter.current_height())['height'])
+        return self.tip
+
+    async def _with_txs(self, block):
+        if not self.with_txs:
+            return block, None
+        while True:
+            try:
+                res = await self.lighter.blocktxs(height=block['height'])
+                return block, res.get('txs') or []
+            except Exception as e:
+                logging.warning(f"blocktxs {block['height']} failed, retrying: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _produce(self, queue, height):
+        while True:
+            try:
+                tip = await self.current_height()
+                while height <= tip:
+                    page = await self.lighter.blocks(limit=min(PAGE_BLOCKS, tip - height + 1), index=height, sort='asc')
+                    blocks = [block for block in page.get('blocks') or [] if block['height'] >= height]
+                    if not blocks:
+                        break
+                    for block in blocks:
+                        await queue.put(asyncio.create_task(self._with_txs(block)))
+                        height = block['height'] + 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"chain follower at height {height} failed, retrying: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def follow(self):
+        """
+        Yields:
+            tuple: (block, txs) in height order, txs None without `with_txs`.
+        """
+        if self.height is not None:
+            height = self.height + 1
+        elif self.start is not None:
+            height = self.start
+        else:
+            height = await self.current_height()
+        queue = asyncio.Queue(maxsize=self.concurrency)
+        producer = asyncio.create_task(self._produce(queue, height))
+        try:
+            while True:
+                task = await queue.get()
+                block, txs = await task
+                yield block, txs
+                self.height = block['height']
+                self.checkpoint()
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                queue.get_nowait().cancel()
+            self.checkpoint(force=True)
+
+    def __aiter__(self):
+        self.generator = self.follow()
+        return self.generator
+
+    async def close(self):
+        if self.generator is not None:
+            await self.generator.aclose()
+            self.generator = None
+        self.checkpoint(force=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def lag(self):
+        """Blocks between the last processed height and the last seen chain height."""
+        if self.tip is None or self.height is None:
+            return None
+        return self.tip - self.height
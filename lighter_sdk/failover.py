@@ -0,0 +1,80 @@
+import time
+from collections import deque
+
+class HostPool:
+    """
+    Rolling health scores for several base urls serving the same API. Each host keeps an
+    exponentially weighted latency and error rate; requests go to the host with the lowest
+    latency weighted by errors, and a host failing `max_failures` times in a row is put last for
+    `cooldown` seconds. Hosts without samples score best, so every host gets probed, and a host's
+    error rate halves every `cooldown` seconds without samples, so a recovered host is tried again.
+
+    Args:
+        urls (list): The base urls.
+        alpha (float, optional): The weight of the newest sample in the moving averages. Defaults to 0.2.
+        error_weight (float, optional): How much the error rate inflates a host's latency score. Defaults to 10.
+        max_failures (int, optional): Consecutive failures before a host is cooled down. Defaults to 3.
+        cooldown (float, optional): Seconds a failing host is put last. Defaults to 5.
+        window (int, optional): The number of recent successful latencies kept for hedging percentiles. Defaults to 256.
+    """
+
+    def __init__(self, urls, alpha=0.2, error_weight=10, max_failures=3, cooldown=5, window=256):
+        self.urls = list(urls)
+        self.alpha = alpha
+        self.error_weight = error_weight
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.latency = {url: 0. for url in self.urls}
+        self.error_rate = {url: 0. for url in self.urls}
+        self.failures = {url: 0 for url in self.urls}
+        self.down_until = {url: 0. for url in self.urls}
+        self.requests = {url: 0 for url in self.urls}
+        self.last_seen = {url: 0. for url in self.urls}
+        self.samples = deque(maxlen=window)
+        self.hedged = 0
+
+    def errors(self, url, now=None):
+        now = time.monotonic() if now is None else now
+        return self.error_rate[url] * 0.5 ** ((now - self.last_seen[url]) / self.cooldown)
+
+    def score(self, url, now=None):
+        errors = self.errors(url, now)
+        return (self.latency[url] + errors) * (1 + self.error_weight * errors)
+
+    def ranked(self):
+        """The hosts from healthiest to least healthy, cooled down hosts last."""
+        now = time.monotonic()
+        return sorted(self.urls, key=lambda url: (self.down_until[url] > now, self.score(url, now)))
+
+    def record(self, url, seconds, ok):
+        alpha = self.alpha
+        now = time.monotonic()
+        self.requests[url] += 1
+        errors = self.errors(url, now)
+        self.error_rate[url] = errors + alpha * ((0. if ok else 1.) - errors)
+        self.last_seen[url] = now
+        if ok:
+            latency = self.latency[url]
+            self.latency[url] = seconds if not latency else latency + alpha * (seconds - latency)
+            self.failures[url] = 0
+            self.samples.append(seconds)
+        else:
+            self.failures[url] += 1
+            if self.failures[url] >= self.max_failures:
+                self.down_until[url] = now + self.cooldown
+
+    def threshold(self, percentile, min_samples=20):
+        """The `percentile` (0-100) of recent latencies, None until there are `min_samples`."""
+        if len(self.samples) < min_samples:
+            return None
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(percentile / 100 * len(samples)))]
+
+    def stats(self):
+        now = time.monotonic()
+        return {url: {
+            'latency': self.latency[url],
+            'error_rate': self.errors(url, now),
+            'requests': self.requests[url],
+            'down': self.down_until[url] > now,
+        } for url in self.urls} | {'hedged': self.hedged}
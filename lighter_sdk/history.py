@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import struct
+import asyncio
+import logging
+
+RESOLUTIONS = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '4h': 14400,
+    '12h': 43200,
+    '1d': 86400,
+    '1w': 604800,
+}
+
+#bars requested per call, the server caps a single window
+CHUNK_BARS = 500
+
+def to_seconds(ts):
+    '''response timestamps are in ms, request windows in s'''
+    return ts // 1000 if ts > 10**11 else ts
+
+
+class HistoryStore:
+    """
+    A compact, append-only local store of historical bars. Each (kind, market, resolution) series is one
+    file of fixed-size little-endian records sorted by timestamp, so the stored range is known from the
+    first and last record alone and new data is appended without rewriting the file. A JSON sidecar next
+    to it (`.coverage`) keeps the windows already fetched, so windows without bars are not fetched again.
+
+    Args:
+        root (str): The directory holding the series files.
+    """
+
+    FIELDS = {
+        'candlesticks': ('timestamp', 'open', 'high', 'low', 'close', 'volume0', 'volume1'),
+        'fundings': ('timestamp', 'value', 'rate'),
+    }
+    FORMATS = {
+        'candlesticks': struct.Struct('<q6d'),
+        'fundings': struct.Struct('<q2d'),
+    }
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, kind, market_id, resolution):
+        return os.path.join(self.root, kind, f'{market_id}_{resolution}.bin')
+
+    def coverage(self, kind, market_id, resolution):
+        """Returns the sorted (lo, hi) windows (s) already fetched for a series, including the ones without bars."""
+        try:
+            with open(f'{self.path(kind, market_id, resolution)}.coverage', 'rb') as f:
+                return [tuple(span) for span in json.load(f)]
+        except FileNotFoundError:
+            return []
+
+    def cover(self, kind, market_id, resolution, ranges):
+        """Records fetched (lo, hi) windows (s) in the series' coverage sidecar, so they are not requested again."""
+        if not ranges:
+            return
+        path = f'{self.path(kind, market_id, resolution)}.coverage'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        merged = merge_ranges(self.coverage(kind, market_id, resolution) + list(ranges))
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(merged, f)
+        os.replace(f'{path}.tmp', path)
+
+    @classmethod
+    def to_row(cls, kind, item):
+        if kind == 'fundings':
+            rate = float(item['rate'])
+            return (int(item['timestamp']), float(item['value']), -rate if item.get('direction') == 'short' else rate)
+        return tuple([int(item['timestamp'])] + [float(item[field]) for field in cls.FIELDS[kind][1:]])
+
+    def bounds(self, kind, market_id, resolution):
+        """Returns the (first, last) stored timestamps of a series, or None if it is empty."""
+        fmt = self.FORMATS[kind]
+        try:
+            with open(self.path(kind, market_id, resolution), 'rb') as f:
+                size = f.seek(0, os.SEEK_END) // fmt.size * fmt.size
+                if not size:
+                    return None
+                f.seek(0)
+                first = fmt.unpack(f.read(fmt.size))[0]
+                f.seek(size - fmt.size)
+                last = fmt.unpack(f.read(fmt.size))[0]
+                return first, last
+        except FileNotFoundError:
+            return None
+
+    def read(self, kind, market_id, resolution, start=None, end=None):
+        """Returns the stored rows of a series, optionally restricted to timestamps in [start, end] (s)."""
+        fmt = self.FORMATS[kind]
+        try:
+            with open(self.path(kind, market_id, resolution), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        raw = raw[:len(raw) // fmt.size * fmt.size]
+        rows = list(fmt.iter_unpack(raw))
+        if start is not None:
+            rows = [row for row in rows if to_seconds(row[0]) >= start]
+        if end is not None:
+            rows = [row for row in rows if to_seconds(row[0]) <= end]
+        return rows
+
+    def write(self, kind, market_id, resolution, rows):
+        """
+        Adds rows to a series. Rows after the stored range are appended; rows before it (a backfill)
+        or filling gaps inside it are merged by rewriting the file once. Stored rows are kept.
+        """
+        if not rows:
+            return
+        fmt = self.FORMATS[kind]
+        path = self.path(kind, market_id, resolution)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        bounds = self.bounds(kind, market_id, resolution)
+        rows = sorted({row[0]: row for row in rows}.values())
+        if bounds is None:
+            earlier, tail = [], rows
+        else:
+            earlier = [row for row in rows if row[0] <= bounds[1]]
+            tail = [row for row in rows if row[0] > bounds[1]]
+        if earlier:
+            existing = self.read(kind, market_id, resolution)
+            stored = {row[0] for row in existing}
+            merged = sorted(existing + [row for row in earlier if row[0] not in stored]) + tail
+            tmp = f'{path}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(b''.join(fmt.pack(*row) for row in merged))
+            os.replace(tmp, path)
+        elif tail:
+            with open(path, 'ab') as f:
+                f.write(b''.join(fmt.pack(*row) for row in tail))
+
+
+def missing_ranges(timestamps, start, end, step, covered=()):
+    '''
+    the [start, end] windows (s) covered neither by the sorted stored bar timestamps (s), each bar spanning
+    `step` seconds, nor by the `covered` (lo, hi) windows already fetched: before and after them, and in between
+    '''
+    spans = sorted([(ts, ts + step - 1) for ts in timestamps if start <= ts <= end] + [tuple(span) for span in covered])
+    ranges, lo = [], start
+    for span_lo, span_hi in spans:
+        if span_lo > lo:
+            ranges.append((lo, min(span_lo - 1, end)))
+        lo = max(lo, span_hi + 1)
+        if lo > end:
+            break
+    if lo <= end:
+        ranges.append((lo, end))
+    return ranges
+
+
+def merge_ranges(ranges):
+    '''the union of (lo, hi) windows (s), as sorted disjoint windows with touching ones joined'''
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def chunk_ranges(ranges, step, bars=CHUNK_BARS):
+    '''
+    packs sorted missing windows into as few server-sized requests of at most `bars` bars as possible: nearby
+    gaps share one window, refetching the stored bars between them, and long gaps are split
+    '''
+    span = step * bars
+    chunks = []
+    for lo, hi in ranges:
+        while lo <= hi:
+            if chunks and lo < chunks[-1][0] + span:
+                chunk_lo = chunks[-1][0]
+                chunks[-1] = (chunk_lo, min(hi, chunk_lo + span - 1))
+            else:
+                chunks.append((lo, min(hi, lo + span - 1)))
+            lo = chunks[-1][1] + 1
+    return chunks
+
+
+async def download_history(
+    lighter,
+    kind,
+    tickers,
+    resolution='1h',
+    start=None,
+    end=None,
+    store=None,
+    concurrency=8,
+    is_index=False
+):
+    """
+    Bulk-download candlesticks or fundings for many markets. The time range is split into server-sized
+    windows, which are fetched with at most `concurrency` requests in flight across all markets. With a
+    store, only the windows missing from it are fetched (before, after and gaps inside the stored range),
+    nearby gaps packed into shared windows, and the new rows are persisted. Fetched windows of closed bars
+    are recorded in the store's coverage, so windows the exchange has no bars for are not requested again.
+
+    A failed window does not abort the download: every market keeps and persists the windows that
+    succeeded, and a market with failed windows maps to the first exception instead of its rows. Its
+    missing windows are fetched by the next call.
+
+    Args:
+        lighter (Lighter): An initialized client.
+        kind (str): 'candlesticks' or 'fundings'.
+        tickers (list): The tickers (or market ids, if `is_index`) to download.
+        resolution (str, optional): The bar resolution, a key of `RESOLUTIONS`. Defaults to '1h'.
+        start (int, optional): The range start in unix seconds. Defaults to 30 days before `end`.
+        end (int, optional): The range end in unix seconds. Defaults to now.
+        store (HistoryStore, optional): The local store to read from and persist to. Defaults to None.
+        concurrency (int, optional): The maximum number of requests in flight. Defaults to 8.
+        is_index (bool, optional): Whether `tickers` are market ids. Defaults to False.
+
+    Returns:
+        dict: ticker -> rows over [start, end], each row a tuple of `HistoryStore.FIELDS[kind]`, or the exception if a window failed.
+    """
+    step = RESOLUTIONS[resolution]
+    end = end or int(time.time())
+    start = start or end - 30 * 86400
+    fetch = getattr(lighter, kind)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_chunk(market_id, lo, hi):
+        async with semaphore:
+            res = await fetch(
+                market_id,
+                resolution=resolution,
+                start=lo,
+                end=hi,
+                count_back=(hi - lo) // step + 1,
+                is_index=True
+            )
+        return [HistoryStore.to_row(kind, item) for item in res.get(kind) or []]
+
+    async def fetch_market(ticker):
+        market_id = lighter.ticker_to_idx[ticker] if not is_index else ticker
+        stored = await asyncio.to_thread(store.read, kind, market_id, resolution, start, end) if store else []
+        covered = await asyncio.to_thread(store.coverage, kind, market_id, resolution) if store else ()
+        chunks = chunk_ranges(missing_ranges([to_seconds(row[0]) for row in stored], start, end, step, covered), step)
+        pages = await asyncio.gather(*[fetch_chunk(market_id, lo, hi) for lo, hi in chunks], return_exceptions=True)
+        errors = [page for page in pages if isinstance(page, Exception)]
+        rows = sorted({row[0]: row for page in pages if not isinstance(page, Exception) for row in page}.values())
+        if store is None:
+            if errors:
+                raise errors[0]
+            return rows
+        #only closed bars are persisted, the forming bar would otherwise be frozen in the store
+        now = time.time()
+        closed = [row for row in rows if to_seconds(row[0]) + step <= now]
+        forming = rows[len(closed):]
+        await asyncio.to_thread(store.write, kind, market_id, resolution, closed)
+        fetched = [(lo, min(hi, int(now) - step)) for (lo, hi), page in zip(chunks, pages) if not isinstance(page, Exception)]
+        await asyncio.to_thread(store.cover, kind, market_id, resolution, [(lo, hi) for lo, hi in fetched if lo <= hi])
+        if errors:
+            raise errors[0]
+        stored = await asyncio.to_thread(store.read, kind, market_id, resolution, start, end)
+        return stored + [row for row in forming if not stored or row[0] > stored[-1][0]]
+
+    results = await asyncio.gather(*[fetch_market(ticker) for ticker in tickers], return_exceptions=True)
+    failed = [ticker for ticker, res in zip(tickers, results) if isinstance(res, Exception)]
+    if failed:
+        logging.warning(f"history download failed for {len(failed)} of {len(tickers)} markets: {failed}")
+    return dict(zip(tickers, results))
@@ -1,7 +1,16 @@
 import json 
 import httpx
 import orjson
+import time
+import random
+import asyncio
 import logging
+import importlib.util
+
+from lighter_sdk.failover import HostPool
+
+#httpx needs the optional h2 package for http2=True
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
 
 class HTTPException(Exception):
     """
@@ -19,25 +28,166 @@ class HTTPException(Exception):
         self.cargs = {} if cargs is None else cargs
 
     def __repr__(self):
-        return f'status{self.status_code} :: {self.message}\n{self.headers}' + (f'\n{json.dumps(self.cargs)}' if self.cargs else '')
+        return f'status{self.status_code} :: {self.message}\n{self.headers}' + (f'\n{json.dumps(self.cargs, default=str)}' if self.cargs else '')
 
     __str__ = __repr__
 
 
+class RetryPolicy:
+    """
+    A retry policy with jittered exponential backoff, a shared retry budget and classification of
+    retriable failures. Connection failures are retried for any method, since the request never
+    reached the server. 5xx and 429 responses and timeouts are only retried for idempotent requests.
+    A 429 or 503 with a Retry-After header waits at least that long.
+
+    Args:
+        retries (int, optional): The maximum number of retries per request. Defaults to 2.
+        backoff (float, optional): The base backoff in seconds, doubled on every attempt. Defaults to 0.1.
+        max_backoff (float, optional): The cap on a single backoff in seconds. Defaults to 5.
+        budget_ratio (float, optional): Retry tokens earned per request. Defaults to 0.2, i.e. at most ~20% extra load from retries.
+        budget_burst (float, optional): The maximum number of retry tokens held. Defaults to 10.
+        retry_statuses (tuple, optional): Response status codes considered transient. Defaults to (429, 500, 502, 503, 504).
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+    CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+    def __init__(
+        self,
+        retries=2,
+        backoff=0.1,
+        max_backoff=5,
+        budget_ratio=0.2,
+        budget_burst=10,
+        retry_statuses=(429, 500, 502, 503, 504)
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.retry_statuses = retry_statuses
+        self.tokens = budget_burst
+
+    def deposit(self):
+        self.tokens = min(self.budget_burst, self.tokens + self.budget_ratio)
+
+    def withdraw(self):
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def is_retriable(self, exc, method='GET', idempotent=None):
+        if isinstance(exc, self.CONNECT_ERRORS):
+            return True
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        if not idempotent:
+            return False
+        if isinstance(exc, HTTPException):
+            return exc.status_code in self.retry_statuses
+        return isinstance(exc, httpx.TransportError)
+
+    def delay(self, attempt, exc=None):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if isinstance(exc, HTTPException) and exc.status_code in (429, 503):
+            retry_after = exc.headers.get('retry-after') if exc.headers else None
+            try:
+                delay = max(delay, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+        return delay
+
+
 class HTTPClient:
     """
-    An asynchronous HTTP aiosonic client for fast network requests and (de)serialization 
-    of data packets. Automatic retries and error handling.
+    An asynchronous HTTP httpx client for fast network requests and (de)serialization 
+    of data packets. Pooled keepalive connections, optional HTTP/2, automatic retries and error handling.
 
     Args:
-        base_url (str, optional): The base URL for all requests. Defaults to an empty string.
-        json_decoder (callable, optional): The JSON decoder function to use. Defaults to `orjson.loads`.
+        base_url (str or list, optional): The base URL for all requests, or several base URLs serving the same API.
+            With several, each request goes to the healthiest host by rolling latency and error rate (see `HostPool`),
+            and retries fail over to the next one. Defaults to an empty string.
+        json_decoder (callable, optional): The JSON decoder function, applied to the raw response bytes. Defaults to `orjson.loads`.
+        json_encoder (callable, optional): The JSON encoder function, producing the raw request body bytes. Defaults to `orjson.dumps`.
+        max_connections (int, optional): The maximum number of concurrent connections in the pool. Defaults to 100.
+        max_keepalive_connections (int, optional): The maximum number of idle connections kept alive. Defaults to 20.
+        keepalive_expiry (float, optional): Seconds an idle connection is kept alive. Defaults to 30.
+        http2 (bool, optional): Whether to negotiate HTTP/2 and multiplex requests over a single connection. Requires `h2`. Defaults to False.
+        timeout (float, optional): The request timeout in seconds. Defaults to 10.
+        retry_policy (RetryPolicy, optional): The retry policy shared by all requests. Defaults to `RetryPolicy()`.
+        scheduler (RequestScheduler, optional): A client-side rate limiter every request (and retry) is admitted through. Defaults to None.
+        cache (ResponseCache, optional): A TTL cache with single-flight coalescing for GET requests to the endpoints it lists. Defaults to None.
+        transport (httpx.AsyncBaseTransport, optional): A custom transport, e.g. `RecordingTransport` or `ReplayTransport` for offline runs. Defaults to None.
+        metrics (LatencyRecorder, optional): Records per-endpoint queue, network, decode and total latency, retries and errors. No timing is taken without it. Defaults to None.
+        hedge (float, optional): With several base URLs, the latency percentile (0-100) after which an idempotent GET still
+            in flight is duplicated to the next healthiest host; the first good response wins. Defaults to None (no hedging).
     """
 
-    def __init__(self, base_url='', json_decoder=orjson.loads):
+    def __init__(
+        self,
+        base_url='',
+        json_decoder=orjson.loads,
+        json_encoder=orjson.dumps,
+        max_connections=100,
+        max_keepalive_connections=20,
+        keepalive_expiry=30,
+        http2=False,
+        timeout=10,
+        retry_policy=None,
+        scheduler=None,
+        cache=None,
+        metrics=None,
+        transport=None,
+        hedge=None
+    ):
         self.client = None
-        self.base_url = base_url
+        base_urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.base_url = base_urls[0]
+        self.hosts = HostPool(base_urls) if len(base_urls) > 1 else None
+        self.hedge = hedge
         self.json_decoder = json_decoder
+        self.json_encoder = json_encoder
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        if http2 and not HTTP2_AVAILABLE:
+            logging.warning("http2 requested but the h2 package is not installed, falling back to HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.scheduler = scheduler
+        self.cache = cache
+        self.metrics = metrics
+        self.transport = transport
+
+    def _make_client(self):
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+            transport=self.transport
+        )
+
+    async def warmup(self, connections=1, endpoint='/'):
+        """
+        Open pooled connections ahead of the first real request, so it does not pay for TCP and TLS setup.
+
+        Args:
+            connections (int, optional): The number of connections to open. A single connection is enough with HTTP/2. Defaults to 1.
+            endpoint (str, optional): A cheap endpoint to request on each connection. Defaults to '/'.
+        """
+        if not self.client:
+            self.client = self._make_client()
+        connections = 1 if self.http2 else connections
+        base_urls = self.hosts.urls if self.hosts else [self.base_url]
+        await asyncio.gather(
+            *[self.client.get(base_url + endpoint) for base_url in base_urls for _ in range(connections)],
+            return_exceptions=True
+        )
 
     async def request(
         self,
@@ -47,21 +197,26 @@ class HTTPClient:
         headers={"content-type": "application/json"},
         params = None,
         json = None,
+        data = None,
         return_exceptions = False,
-        retries = 2
+        retries = None,
+        idempotent = None
     ):
         """
-        Make an HTTP request and handle retries on failure.
+        Make an HTTP request and retry transient failures according to the retry policy. 
+        A failed request never tears down the shared connection pool.
 
         Args:
-            url (str, optional): The full URL for the request. If not provided, `base_url` + `endpoint` is used. Defaults to an empty string.
+            url (str, optional): The full URL for the request, never failed over. If not provided, `base_url` + `endpoint` is used. Defaults to an empty string.
             endpoint (str, optional): The endpoint to append to the base URL. Defaults to an empty string.
             method (str, optional): The HTTP method to use. Defaults to 'GET'.
             headers (dict, optional): The headers to include in the request. Defaults to {"content-type": "application/json"}.
             params (dict, optional): The URL parameters to include in the request. Defaults to None.
             json (dict): The json key-values to include in the request body. Defaults to None.
+            data (dict): The form key-values to include in the request body. Defaults to None.
             return_exceptions (bool, optional): Whether to return exceptions instead of raising them. Defaults to False. No retries if True.
-            retries (int, optional): The number of retries if the request fails. Defaults to 2.
+            retries (int, optional): The maximum number of retries if the request fails. Defaults to the retry policy's.
+            idempotent (bool, optional): Whether the request is safe to resend after it may have reached the server. Defaults to True for GET/HEAD/OPTIONS/PUT/DELETE.
 
         Returns:
             dict: The parsed JSON response if the request is successful.
@@ -69,56 +224,132 @@ class HTTPClient:
         Raises:
             HTTPException: If the response status code is 400 or higher.
         """
+        cache = self.cache
+        if cache is not None and method == 'GET' and not url and not return_exceptions and cache.ttl(endpoint):
+            return await cache.get(
+                endpoint,
+                params,
+                lambda: self._request(url, endpoint, method, headers, params, json, data, return_exceptions, retries, idempotent)
+            )
+        return await self._request(url, endpoint, method, headers, params, json, data, return_exceptions, retries, idempotent)
+
+    async def _request(self, url, endpoint, method, headers, params, json, data, return_exceptions, retries, idempotent):
         if not self.client:
-            self.client = httpx.AsyncClient()
+            self.client = self._make_client()
+        pooled = self.hosts is not None and not url
+        url = url if url else self.base_url + endpoint
+        url = url + f"?{params}" if isinstance(params, str) else url
+        params = {} if isinstance(params, str) else params
+        request_args = {
+            "url": url,
+            "method": method,
+            "headers": headers,
+            "params": params,
+            "content": self.json_encoder(json) if json is not None else None,
+            "data": data
+        }
+        policy = self.retry_policy
+        retries = policy.retries if retries is None else retries
+        policy.deposit()
+        scheduler = self.scheduler
+        metrics = self.metrics
+        path = (endpoint or httpx.URL(url).path) if scheduler or metrics is not None else None
+        hedge = self.hedge if pooled and method == 'GET' and idempotent is not False else None
+        start = time.perf_counter() if metrics is not None else 0
+        attempt = 0
+        while True:
+            try:
+                if metrics is None:
+                    if scheduler:
+                        await scheduler.acquire(path)
+                    response = await (self._failover(request_args, hedge) if pooled else self.client.request(**request_args))
+                    if scheduler:
+                        scheduler.update(response.status_code, response.headers)
+                    return await self.handler(response,cargs=request_args)
+                t0 = time.perf_counter()
+                if scheduler:
+                    await scheduler.acquire(path)
+                t1 = time.perf_counter()
+                response = await (self._failover(request_args, hedge) if pooled else self.client.request(**request_args))
+                t2 = time.perf_counter()
+                if scheduler:
+                    scheduler.update(response.status_code, response.headers)
+                try:
+                    return await self.handler(response,cargs=request_args)
+                finally:
+                    t3 = time.perf_counter()
+                    metrics.record(path, 'queue', t1 - t0)
+                    metrics.record(path, 'network', t2 - t1)
+                    metrics.record(path, 'decode', t3 - t2)
+                    metrics.record(path, 'total', t3 - start)
+            except Exception as e:
+                if metrics is not None:
+                    metrics.count(path, 'errors')
+                if return_exceptions:
+                    return e
+                if attempt >= retries or not policy.is_retriable(e, method, idempotent) or not policy.withdraw():
+                    raise e
+                if metrics is not None:
+                    metrics.count(path, 'retries')
+                delay = policy.delay(attempt, e)
+                logging.debug(f"retrying {method} {url} in {delay:.3f}s after {e!r}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _send(self, host, request_args):
+        '''sends to `host`, scoring it; 5xx and 429 responses count against the host'''
+        hosts = self.hosts
+        t0 = time.perf_counter()
+        try:
+            response = await self.client.request(**{**request_args, 'url': host + request_args['url'][len(self.base_url):]})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            hosts.record(host, time.perf_counter() - t0, ok=False)
+            raise
+        hosts.record(host, time.perf_counter() - t0, ok=response.status_code < 500 and response.status_code != 429)
+        return response
+
+    async def _failover(self, request_args, hedge):
+        ranked = self.hosts.ranked()
+        delay = self.hosts.threshold(hedge) if hedge is not None else None
+        if delay is None:
+            return await self._send(ranked[0], request_args)
+        primary = asyncio.create_task(self._send(ranked[0], request_args))
+        pending = {primary}
+        fallback = None
         try:
-            url = url if url else self.base_url + endpoint
-            url = url + f"?{params}" if isinstance(params, str) else url
-            params = {} if isinstance(params, str) else params
-            request_args = {
-                "url": url,
-                "method": method,
-                "headers": headers,
-                "params": params,
-                "json": json
-            }
-
-            response = await self.client.request(**request_args)
-            return await self.handler(response,cargs=request_args)
-        except Exception as e:
-            if return_exceptions:
-                return e
-            if retries > 0:
-                await self.cleanup()
-                self.client = httpx.AsyncClient()
-                return await self.request(
-                    url=url, 
-                    endpoint=endpoint, 
-                    method=method, 
-                    headers=headers, 
-                    params=params, 
-                    json=json, 
-                    retries=retries - 1
-                )
-            raise e
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            self.hosts.hedged += 1
+            pending.add(asyncio.create_task(self._send(ranked[1], request_args)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        return task.result()
+                    fallback = fallback or task
+            return fallback.result()
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def handler(self, response, cargs={}):
         status_code = response.status_code
+        content = response.content
         if status_code < 400:
-            return response.json() if response.text else {}
+            return self.json_decoder(content) if content else {}
         try:
-            err = response.text
-            err = json.loads(err)
-        except json.JSONDecodeError:
-            pass
-        finally:
-            raise HTTPException(status_code=status_code, message=err, headers=response.headers, cargs=cargs)
+            err = self.json_decoder(content)
+        except Exception:
+            err = content.decode(errors='replace')
+        raise HTTPException(status_code=status_code, message=err, headers=response.headers, cargs=cargs)
             
     async def cleanup(self):
         try:
             if self.client:
                 await self.client.aclose()
-                await self.client.__aexit__(None, None, None)
-                del self.client
         except:
-            pass
\ No newline at end of file
+            pass
+        self.client = None
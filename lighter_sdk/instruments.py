@@ -0,0 +1,142 @@
+class Instrument:
+    """
+    The trading metadata of a single market, with precomputed integer scale factors.
+
+    Args:
+        symbol (str): The market ticker, e.g. 'ETH'.
+        market_id (int): The market index.
+        price_decimals (int): The supported price decimals.
+        size_decimals (int): The supported size decimals.
+        min_base (float): The minimum order size in base units.
+        min_quote (float): The minimum order notional in quote units.
+    """
+    __slots__ = (
+        'symbol',
+        'market_id',
+        'price_decimals',
+        'size_decimals',
+        'price_scale',
+        'size_scale',
+        'min_base',
+        'min_quote',
+    )
+
+    def __init__(self, symbol, market_id, price_decimals, size_decimals, min_base, min_quote):
+        self.symbol = symbol
+        self.market_id = market_id
+        self.price_decimals = price_decimals
+        self.size_decimals = size_decimals
+        self.price_scale = 10 ** price_decimals
+        self.size_scale = 10 ** size_decimals
+        self.min_base = min_base
+        self.min_quote = min_quote
+
+    @classmethod
+    def from_orderbook(cls, ticker):
+        return cls(
+            symbol=ticker['symbol'],
+            market_id=int(ticker['market_id']),
+            price_decimals=int(ticker['supported_price_decimals']),
+            size_decimals=int(ticker['supported_size_decimals']),
+            min_base=float(ticker['min_base_amount']),
+            min_quote=float(ticker['min_quote_amount']),
+        )
+
+    def quantize(self, price, amount):
+        """
+        Scale a price and signed amount to the integer units the exchange signs.
+
+        Returns:
+            tuple: (price, base_amount, is_ask) as integers and bool.
+
+        Raises:
+            ValueError: If the order is below the minimum base amount or minimum quote notional.
+        """
+        size = abs(amount)
+        if size < self.min_base:
+            raise ValueError(f"Minimum base amount for {self.symbol} is {self.min_base}")
+        if size * price < self.min_quote:
+            raise ValueError(f"Minimum quote amount for {self.symbol} is {self.min_quote}")
+        return round(price * self.price_scale), round(size * self.size_scale), amount < 0
+
+    def __repr__(self):
+        return f'Instrument({self.symbol}, {self.market_id})'
+
+
+class InstrumentTable:
+    """
+    A registry of `Instrument`s indexed by both symbol and market id.
+
+    Args:
+        order_books (list, optional): The `order_books` of the orderbooks endpoint to load. Defaults to None.
+    """
+
+    def __init__(self, order_books=None):
+        self.by_symbol = {}
+        self.by_id = {}
+        self.ticker_to_idx = {}
+        self.idx_to_ticker = {}
+        if order_books:
+            self.load(order_books)
+
+    def load(self, order_books):
+        instruments = [Instrument.from_orderbook(ticker) for ticker in order_books]
+        self.by_symbol = {instrument.symbol: instrument for instrument in instruments}
+        self.by_id = {instrument.market_id: instrument for instrument in instruments}
+        self.ticker_to_idx = {instrument.symbol: instrument.market_id for instrument in instruments}
+        self.idx_to_ticker = {instrument.market_id: instrument.symbol for instrument in instruments}
+
+    def get(self, ticker, is_index=False):
+        return self.by_id[ticker] if is_index else self.by_symbol[ticker]
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def quantize_many(self, tickers, prices, amounts, is_index=False):
+        """
+        Vectorized quantization and validation of many orders at once, e.g. before a batch is signed.
+
+        Args:
+            tickers (list): The ticker (or market id, if `is_index`) of each order, or a single one for all.
+            prices (array-like): The order prices.
+            amounts (array-like): The signed order amounts, negative for asks.
+            is_index (bool, optional): Whether `tickers` are market ids. Defaults to False.
+
+        Returns:
+            tuple: (market_ids, prices, base_amounts, is_ask) as NumPy arrays.
+
+        Raises:
+            ValueError: Listing every order below its market's minimum base amount or quote notional.
+        """
+        import numpy as np
+        prices = np.asarray(prices, dtype=np.float64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if isinstance(tickers, (str, int, np.integer)):
+            instruments = [self.get(tickers, is_index)] * len(prices)
+        else:
+            instruments = [self.get(ticker, is_index) for ticker in tickers]
+        market_ids = np.fromiter((i.market_id for i in instruments), dtype=np.int64, count=len(instruments))
+        price_scale = np.fromiter((i.price_scale for i in instruments), dtype=np.float64, count=len(instruments))
+        size_scale = np.fromiter((i.size_scale for i in instruments), dtype=np.float64, count=len(instruments))
+        min_base = np.fromiter((i.min_base for i in instruments), dtype=np.float64, count=len(instruments))
+        min_quote = np.fromiter((i.min_quote for i in instruments), dtype=np.float64, count=len(instruments))
+
+        sizes = np.abs(amounts)
+        bad = np.flatnonzero((sizes < min_base) | (sizes * prices < min_quote))
+        if len(bad):
+            raise ValueError(
+                "Orders below minimum size: " + ', '.join(
+                    f"#{i} {instruments[i].symbol} amount={amounts[i]} price={prices[i]} "
+                    f"(min base {instruments[i].min_base}, min quote {instruments[i].min_quote})"
+                    for i in bad
+                )
+            )
+        return (
+            market_ids,
+            np.rint(prices * price_scale).astype(np.int64),
+            np.rint(sizes * size_scale).astype(np.int64),
+            amounts < 0,
+        )
@@ -1,15 +1,42 @@
+import os
+import json
 import time
+import orjson
 import asyncio 
 import logging
 
 from datetime import datetime
-from lighter import SignerClient
-from lighter_sdk.httpx import HTTPClient
+from concurrent.futures import ThreadPoolExecutor
+from lighter_sdk.httpx import HTTPClient, HTTPException
+from lighter_sdk.cache import ResponseCache
+from lighter_sdk.nonce import NonceManager
+from lighter_sdk.auth import AuthTokenProvider
+from lighter_sdk.signing import SigningProcessPool, sign_in_worker
+from lighter_sdk.instruments import InstrumentTable
+from lighter_sdk.history import HistoryStore, download_history
+from lighter_sdk.state import AccountState
+from lighter_sdk.paginate import paginate, cursor_params, index_params
+from lighter_sdk.orderbook import BookEngine, sweep_price
 
 logging.basicConfig(level=logging.INFO)
 
 BASE_URL = "https://mainnet.zklighter.elliot.ai"
+WS_URL = "wss://mainnet.zklighter.elliot.ai/stream"
 CHAIN_ID_MAINNET = 304
+BATCH_LIMIT = 50 #max txs per sendTxBatch
+#SignerClient.TX_TYPE_*, mirrored so the signer is only imported once something is signed
+TX_TYPE_CREATE_ORDER = 14
+TX_TYPE_CANCEL_ORDER = 15
+TX_TYPE_CANCEL_ALL_ORDERS = 16
+TX_TYPE_MODIFY_ORDER = 17
+SIGN_METHODS = {
+    TX_TYPE_CREATE_ORDER:'sign_create_order',
+    TX_TYPE_CANCEL_ORDER:'sign_cancel_order',
+    TX_TYPE_CANCEL_ALL_ORDERS:'sign_cancel_all_orders',
+    TX_TYPE_MODIFY_ORDER:'sign_modify_order',
+}
+
+TIF = {'IOC':0,'GTC':1,'ALO':2}
 
 endpoints = {
     #https://apidocs.lighter.xyz/reference/status (root)
@@ -117,7 +144,7 @@ endpoints = {
     'send_tx_batch': {
         "endpoint": "/api/v1/sendTxBatch",
         "method": "POST",
-    }, #TODO
+    },
 
     'tx':{
         "endpoint": "/api/v1/tx",
@@ -173,12 +200,60 @@ endpoints = {
     },
 }
 
+class BatchError(Exception):
+    '''
+    a batch that failed part way. results > one result per input leg, see Lighter.batch, error > the exception of the failed chunk
+    '''
+    def __init__(self,results,error):
+        super().__init__(f"batch failed after {sum(r['error'] is None for r in results)} of {len(results)} legs were accepted: {type(error).__name__} {getattr(error,'message',error)}")
+        self.results = results
+        self.error = error
+
+
 class Lighter():
     
-    def __init__(self,key=None,secret=None):
+    def __init__(
+        self,
+        key=None,
+        secret=None,
+        http_client=None,
+        cache=False,
+        account_idx=None,
+        api_key_index=0,
+        instruments=None,
+        auth=None,
+        sign_executor=None,
+        sign_workers=None,
+        read_only=False
+    ):
+        '''
+        http_client > optional preconfigured HTTPClient (pool size, keepalive, http2...), defaults to HTTPClient(base_url=BASE_URL)
+        cache > True or a ResponseCache to cache and coalesce slow-changing metadata endpoints (orderbooks, info, exchange_stats...)
+        account_idx, api_key_index > the account and api key the secret signs for. if account_idx is None, it is looked up from the L1 address (first sub account)
+        instruments, auth > optional InstrumentTable and AuthTokenProvider shared with other clients, see AccountManager
+        sign_executor > None to sign on the event loop, 'thread' or 'process' to sign in a pool of sign_workers, or an Executor.
+        a process pool holds a signer per worker. sends are dispatched in nonce order whichever signature completes first.
+        read_only > True for market data workers: init_client only loads the market tables, without importing the signer or waiting on the account.
+        with a secret, the signer is still created (and the account looked up) on the first call that needs it.
+        '''
         self.key = key
         self.secret = secret
-        self.http_client = HTTPClient(base_url=BASE_URL)
+        self.http_client = http_client or HTTPClient(base_url=BASE_URL)
+        if cache:
+            self.http_client.cache = cache if isinstance(cache,ResponseCache) else ResponseCache()
+        self.nonce_manager = NonceManager(fetch=self._fetch_nonce)
+        self.auth = auth or AuthTokenProvider()
+        self.instruments = instruments if instruments is not None else InstrumentTable()
+        self.account_idx = account_idx
+        self.api_key_index = api_key_index
+        self.sign_executor = sign_executor
+        self.sign_workers = sign_workers
+        self.owns_sign_executor = False
+        self.send_turn = None
+        self.read_only = read_only
+        self.client_index = None
+        self.client = None
+        self.signer_init = None
 
         self.aws_manager = None
         self.state_manager = None
@@ -187,58 +262,227 @@ class Lighter():
         self.orders = None 
         self.l2_dict = {}
         self.l2_update = {}
+        self.ws = None
+        self.book_engine = None
 
+        self.refresh_task = None
         self.shutdown = False
         return
 
-    async def init_client(self):
+    async def init_client(self,snapshot_path=None,load_markets=True):
+        '''
+        snapshot_path > optional file holding a snapshot of the market metadata (ticker, precision, min size tables).
+        if it exists the tables are loaded from it and refreshed from orderbooks in the background, so trading can start immediately.
+        otherwise the tables are fetched (concurrently with the account lookup) and the snapshot is written.
+        load_markets > False when the instrument table is shared and loaded elsewhere
+        '''
+        init_signer = [] if self.read_only else [self._ensure_signer()]
+        if not load_markets:
+            await asyncio.gather(*init_signer)
+            return
+
+        order_books = self._load_snapshot(snapshot_path) if snapshot_path else None
+        if order_books is not None:
+            self._set_markets(order_books)
+            self.refresh_task = asyncio.create_task(self._refresh_markets(snapshot_path))
+            await asyncio.gather(*init_signer)
+            return
+
+        ticker_meta, *_ = await asyncio.gather(self.orderbooks(),*init_signer)
+        self._set_markets(ticker_meta['order_books'])
+        if snapshot_path:
+            await asyncio.to_thread(self._write_snapshot,snapshot_path,ticker_meta['order_books'])
+
+    async def _ensure_signer(self):
+        '''creates the signer and initializes the account once, on init_client or (read_only) the first call that signs'''
+        if self.client is not None and self.account_idx is not None:
+            return
+        if self.signer_init is None or self.signer_init.done():
+            if self.secret is None:
+                raise ValueError("No secret to sign with, the client is read only")
+            self.signer_init = asyncio.ensure_future(self._init_signer())
+        await asyncio.shield(self.signer_init)
+
+    async def _init_signer(self):
+        from lighter import SignerClient
+        signer_kwargs = {} if self.account_idx is None else {
+            'account_index':self.account_idx,
+            'api_key_index':self.api_key_index
+        }
         self.client = SignerClient(
             url=BASE_URL,
             private_key=self.secret,
-            chain_id=CHAIN_ID_MAINNET
+            chain_id=CHAIN_ID_MAINNET,
+            **signer_kwargs
         )
+        await self._init_account()
 
-        account_created = False
+    def _init_sign_executor(self):
+        if self.sign_executor == 'thread':
+            self.sign_executor = ThreadPoolExecutor(max_workers=self.sign_workers,thread_name_prefix='lighter-sign')
+        elif self.sign_executor == 'process':
+            self.sign_executor = SigningProcessPool(
+                url=BASE_URL,
+                private_key=self.secret,
+                chain_id=CHAIN_ID_MAINNET,
+                account_index=self.client.account_index,
+                api_key_index=self.client.api_key_index,
+                max_workers=self.sign_workers
+            )
+        else:
+            return
+        self.owns_sign_executor = True
+
+    async def _init_account(self):
+        if self.account_idx is not None:
+            self.auth.register(self.client.account_index,self.client.api_key_index,self.client)
+            self.auth.start()
+            self._init_sign_executor()
+            return
         new_account = False
-        while not account_created:
+        while True:
             try:
-                await self.client.set_account_index()
-                account_created = True
-                if new_account:
-                    await asyncio.sleep(5)
+                _, main = await asyncio.gather(
+                    self.client.set_account_index(),
+                    self.accounts_by_l1_address()
+                )
+                break
             except Exception as e:
                 new_account = True
                 print("Account not created yet")
-            time.sleep(1)
-
-        main = await self.accounts_by_l1_address()
+                await asyncio.sleep(1)
+        if new_account:
+            await asyncio.sleep(5)
+        self.auth.register(self.client.account_index,self.client.api_key_index,self.client)
+        self.auth.start()
+        self._init_sign_executor()
         self.account_idx = main['sub_accounts'][0]['index']
-        ticker_meta = await self.orderbooks()
-        orderbooks = ticker_meta['order_books']
-        
-        ticker_to_idx = {}
-        ticker_to_price_precision = {}
-        ticker_to_lot_precision = {}
-        ticker_min_base = {}
-        ticker_min_quote = {}
-
-        for ticker in orderbooks:
-            ticker_to_idx[ticker['symbol']] = int(ticker['market_id'])
-            ticker_to_price_precision[ticker['symbol']] = int(ticker['supported_price_decimals'])
-            ticker_to_lot_precision[ticker['symbol']] = int(ticker['supported_size_decimals'])
-            ticker_min_base[ticker['symbol']] = float(ticker['min_base_amount'])
-            ticker_min_quote[ticker['symbol']] = float(ticker['min_quote_amount'])
-
-        self.idx_to_ticker = {v:k for k,v in ticker_to_idx.items()}
-        self.ticker_to_idx = ticker_to_idx
-        self.ticker_to_price_precision = ticker_to_price_precision
-        self.ticker_to_lot_precision = ticker_to_lot_precision
-        self.ticker_min_base = ticker_min_base
-        self.ticker_min_quote = ticker_min_quote
-
-    async def cleanup(self):
-        await self.http_client.cleanup()
-        await self.client.close()
+
+    def _set_markets(self,orderbooks):
+        self.instruments.load(orderbooks)
+
+    @property
+    def ticker_to_idx(self):
+        return self.instruments.ticker_to_idx
+
+    @property
+    def idx_to_ticker(self):
+        return self.instruments.idx_to_ticker
+
+    @property
+    def ticker_to_price_precision(self):
+        return {i.symbol:i.price_decimals for i in self.instruments}
+
+    @property
+    def ticker_to_lot_precision(self):
+        return {i.symbol:i.size_decimals for i in self.instruments}
+
+    @property
+    def ticker_min_base(self):
+        return {i.symbol:i.min_base for i in self.instruments}
+
+    @property
+    def ticker_min_quote(self):
+        return {i.symbol:i.min_quote for i in self.instruments}
+
+    def _load_snapshot(self,path):
+        try:
+            with open(path,'rb') as f:
+                return orjson.loads(f.read())['order_books']
+        except (OSError,ValueError,KeyError):
+            return None
+
+    def _write_snapshot(self,path,orderbooks):
+        keys = ('symbol','market_id','supported_price_decimals','supported_size_decimals','min_base_amount','min_quote_amount')
+        snapshot = {
+            'timestamp':int(time.time()),
+            'order_books':[{k:ticker[k] for k in keys} for ticker in orderbooks]
+        }
+        tmp = f'{path}.tmp'
+        with open(tmp,'wb') as f:
+            f.write(orjson.dumps(snapshot))
+        os.replace(tmp,path)
+
+    async def _refresh_markets(self,snapshot_path):
+        try:
+            ticker_meta = await self.orderbooks()
+            self._set_markets(ticker_meta['order_books'])
+            await asyncio.to_thread(self._write_snapshot,snapshot_path,ticker_meta['order_books'])
+        except Exception as e:
+            logging.warning(f"market metadata refresh failed: {e}")
+
+    async def cleanup(self,close_shared=True):
+        '''close_shared > False to leave the http client and auth provider open for other clients sharing them'''
+        if close_shared:
+            await self.auth.close()
+        if self.state_manager is not None:
+            await self.state_manager.close()
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+        if close_shared:
+            await self.http_client.cleanup()
+        if self.owns_sign_executor:
+            self.sign_executor.shutdown(wait=False,cancel_futures=True)
+        if self.signer_init is not None:
+            self.signer_init.cancel()
+        if self.client is not None:
+            await self.client.close()
+
+    def _auth_token(self):
+        '''cached per api key and refreshed in the background before expiry, see self.auth (AuthTokenProvider)'''
+        return self.auth.get(self.client.account_index,self.client.api_key_index)
+
+    async def track_state(self,tickers=None,is_index=False,reconcile_interval=60,stream=True):
+        '''
+        maintains self.orders ({market_id: {order_index: order}}) and self.positions ({market_id: position}) locally.
+        seeded from account and account_active_orders (for tickers, default: markets with open orders),
+        then updated from our own order acks and, if stream, the account websocket channels. reconciled over REST every reconcile_interval seconds.
+        see self.state_manager (AccountState) for lookups by client order index.
+        '''
+        await self._ensure_signer()
+        market_ids = None if tickers is None else [self.ticker_to_idx[t] if not is_index else t for t in tickers]
+        self.state_manager = AccountState(self,reconcile_interval=reconcile_interval)
+        await self.state_manager.seed(market_ids)
+        self.orders = self.state_manager.orders
+        self.positions = self.state_manager.positions
+        if stream:
+            from lighter_sdk.ws import WSClient
+            self.ws = self.ws or WSClient(url=WS_URL)
+            await self.ws.subscribe(f'account_all/{self.account_idx}',self.state_manager.handle)
+            await self.ws.subscribe(
+                f'account_all_orders/{self.account_idx}',
+                self.state_manager.handle,
+                auth=self._auth_token
+            )
+        self.state_manager.start()
+        return self.state_manager
+
+    def _on_l2(self,market_id,book):
+        ticker = self.idx_to_ticker.get(market_id,market_id)
+        self.l2_dict[ticker] = book
+        self.l2_update[ticker] = book.timestamp
+
+    async def subscribe_l2(self,tickers,is_index=False):
+        '''
+        streams the order books of tickers into self.l2_dict[ticker] (OrderBook) and self.l2_update[ticker] (last update time).
+        books are kept in sync from snapshots and deltas, sequence gaps resync automatically.
+        '''
+        if self.book_engine is None:
+            from lighter_sdk.ws import WSClient
+            self.ws = self.ws or WSClient(url=WS_URL)
+            self.book_engine = BookEngine(self.ws,on_update=self._on_l2)
+        for ticker in tickers:
+            market_id = self.ticker_to_idx[ticker] if not is_index else ticker
+            await self.book_engine.subscribe(market_id)
+
+    async def unsubscribe_l2(self,tickers,is_index=False):
+        for ticker in tickers:
+            market_id = self.ticker_to_idx[ticker] if not is_index else ticker
+            await self.book_engine.unsubscribe(market_id)
+            self.l2_dict.pop(self.idx_to_ticker.get(market_id,market_id),None)
+            self.l2_update.pop(self.idx_to_ticker.get(market_id,market_id),None)
 
     async def limit_order(
         self,
@@ -251,27 +495,16 @@ class Lighter():
         reduce_only=False,
         **kwargs
     ): 
-        if tif == 'GTC': tif = 1
-        elif tif == 'IOC': tif = 0
-        elif tif == 'ALO': tif = 2
-        market_id = self.ticker_to_idx[ticker] if not is_index else ticker
-        is_ask = False if amount > 0 else True
-        price = round(price * 10**self.ticker_to_price_precision[ticker])
-        if abs(amount) < self.ticker_min_base[ticker]:
-            raise ValueError(f"Minimum base amount for {ticker} is {self.ticker_min_base[ticker]}")
-        
-        base_amount = round(abs(amount) * 10**self.ticker_to_lot_precision[ticker])
-        return await self.client.create_order(
-            market_index=market_id,
-            client_order_index=client_order_index,
-            base_amount=base_amount,
-            price=price,
-            is_ask=is_ask,
-            order_type=0, #ORDER_TYPE_LIMIT
-            time_in_force=tif,
-            reduce_only=int(reduce_only),
-            trigger_price=0
-        )
+        return await self.submit({
+            'action':'create',
+            'ticker':ticker,
+            'amount':amount,
+            'price':price,
+            'tif':tif,
+            'client_order_index':client_order_index,
+            'is_index':is_index,
+            'reduce_only':reduce_only
+        })
 
     async def market_order(
         self,
@@ -281,16 +514,35 @@ class Lighter():
         reduce_only=False,
         slippage_tolerance=0.03,
         is_index=False,
+        depth=10,
+        max_age=None,
         **kwargs
     ):
+        '''
+        prices a marketable limit order by walking the book to the level that fills amount, padded by slippage_tolerance.
+        uses the streamed book (see subscribe_l2) when it is synced, the stream is connected and, if given, it was updated in the last max_age seconds.
+        otherwise (or when the needed side of the streamed book is empty) fetches only the top depth levels over REST, widening to 100 if they cannot fill amount.
+        '''
         market_id = self.ticker_to_idx[ticker] if not is_index else ticker
-        lob = await self.orderbook_orders(market_id,is_index=True)
-        bids = lob['bids']
-        asks = lob['asks']
-        bb = float(bids[0]['price'])
-        aa = float(asks[0]['price'])
-        price = (bb + aa) / 2
+        symbol = self.idx_to_ticker[market_id]
         is_long = True if amount > 0 else False
+        size = abs(amount)
+
+        book = self.l2_dict.get(symbol)
+        fresh = book is not None and book.synced and self.ws is not None and self.ws.connected.is_set()
+        if fresh and max_age is not None:
+            fresh = time.time() - self.l2_update.get(symbol,0) <= max_age
+        side = (book.asks if is_long else book.bids) if fresh else None
+        if side:
+            levels = side.levels(depth)
+            price, filled = sweep_price(levels,size)
+            if filled < size and len(side) > depth:
+                price, filled = sweep_price(side.levels(),size)
+        else:
+            price, filled = await self._rest_sweep(market_id,size,is_long,depth)
+            if filled < size and depth < 100:
+                price, filled = await self._rest_sweep(market_id,size,is_long,100)
+
         price *= (1 + slippage_tolerance) if is_long else (1 - slippage_tolerance)
         return await self.limit_order(
             ticker=ticker,
@@ -302,13 +554,249 @@ class Lighter():
             **kwargs
         )
 
+    async def _rest_sweep(self,market_id,size,is_long,depth):
+        lob = await self.orderbook_orders(market_id,limit=depth,is_index=True)
+        orders = lob['asks'] if is_long else lob['bids']
+        return sweep_price([(float(o['price']),float(o['remaining_base_amount'])) for o in orders],size)
+
     async def cancel_order(self,ticker,order_id,is_index=False):
-        market_id = self.ticker_to_idx[ticker] if not is_index else ticker
-        return await self.client.cancel_order(
-            market_index=market_id,
-            order_index=int(order_id)
+        return await self.submit({
+            'action':'cancel',
+            'ticker':ticker,
+            'order_id':order_id,
+            'is_index':is_index
+        })
+
+    async def modify_order(self,ticker,order_id,amount,price,is_index=False):
+        '''atomically reprices and resizes a resting order (cancel-replace in one transaction), amount is unsigned'''
+        return await self.submit({
+            'action':'modify',
+            'ticker':ticker,
+            'order_id':order_id,
+            'amount':amount,
+            'price':price,
+            'is_index':is_index
+        })
+
+    async def cancel_all_orders(self):
+        '''cancels every open order of the account in a single transaction'''
+        return await self.submit({'action':'cancel_all'})
+
+    def next_client_order_index(self):
+        '''unique client order indexes for this client, counting up from the current time in ms'''
+        if self.client_index is None:
+            self.client_index = int(time.time() * 1000) % 2 ** 47
+        self.client_index += 1
+        return self.client_index
+
+    def _create_leg(self,action,market_id,price,base_amount,is_ask):
+        client_order_index = action.get('client_order_index',0)
+        if not client_order_index and self.state_manager is not None:
+            #tracked orders are matched to their acks by client order index, so it must be unique
+            client_order_index = self.next_client_order_index()
+        return TX_TYPE_CREATE_ORDER, {
+            'market_index':market_id,
+            'client_order_index':client_order_index,
+            'base_amount':base_amount,
+            'price':price,
+            'is_ask':is_ask,
+            'order_type':0, #ORDER_TYPE_LIMIT
+            'time_in_force':TIF.get(action.get('tif','GTC'),action.get('tif')),
+            'reduce_only':int(action.get('reduce_only',False)),
+            'trigger_price':0
+        }
+
+    def _legs(self,actions):
+        '''
+        resolves legs to (tx_type, signer kwargs) without signing them.
+        action['action'] is one of 'create' (limit_order kwargs), 'modify' (modify_order kwargs), 'cancel' (cancel_order kwargs) or 'cancel_all'.
+        create and modify legs are quantized and validated (min base and min quote) together, so a bad leg fails before any leg is signed.
+        '''
+        creates = [action for action in actions if action['action'] in ('create','modify')]
+        if len(creates) == 1:
+            action = creates[0]
+            instrument = self.instruments.get(action['ticker'],action.get('is_index',False))
+            quantized = [(instrument.market_id,*instrument.quantize(action['price'],action['amount']))]
+        elif creates:
+            quantized = zip(*(column.tolist() for column in self.instruments.quantize_many(
+                [self.instruments.get(action['ticker'],action.get('is_index',False)).market_id for action in creates],
+                [action['price'] for action in creates],
+                [action['amount'] for action in creates],
+                is_index=True
+            )))
+        quantized = iter(quantized) if creates else None
+
+        legs = []
+        for action in actions:
+            if action['action'] == 'create':
+                legs.append(self._create_leg(action,*next(quantized)))
+            elif action['action'] == 'modify':
+                market_id, price, base_amount, _ = next(quantized)
+                legs.append((TX_TYPE_MODIFY_ORDER,{
+                    'market_index':market_id,
+                    'order_index':int(action['order_id']),
+                    'base_amount':base_amount,
+                    'price':price,
+                    'trigger_price':0
+                }))
+            elif action['action'] == 'cancel':
+                market_id = self.instruments.get(action['ticker'],action.get('is_index',False)).market_id
+                legs.append((TX_TYPE_CANCEL_ORDER,{
+                    'market_index':market_id,
+                    'order_index':int(action['order_id'])
+                }))
+            elif action['action'] == 'cancel_all':
+                legs.append((TX_TYPE_CANCEL_ALL_ORDERS,{
+                    'time_in_force':0, #CANCEL_ALL_TIF_IMMEDIATE
+                    'time':0
+                }))
+            else:
+                raise ValueError(f"Unknown batch action {action['action']}")
+        return legs
+
+    def _sign(self,tx_type,kwargs,nonce):
+        tx_info = getattr(self.client,SIGN_METHODS[tx_type])(**kwargs,nonce=nonce)
+        if isinstance(tx_info,tuple):
+            tx_info, err = tx_info
+            if err:
+                raise ValueError(err)
+        return tx_info
+
+    async def _sign_legs(self,legs,nonce):
+        '''signs legs with consecutive nonces from nonce, in parallel in the sign executor if there is one'''
+        executor = self.sign_executor
+        if executor is None:
+            return [(tx_type,self._sign(tx_type,kwargs,nonce=nonce + j)) for j,(tx_type,kwargs) in enumerate(legs)]
+        loop = asyncio.get_running_loop()
+        if isinstance(executor,SigningProcessPool):
+            futures = [
+                loop.run_in_executor(executor,sign_in_worker,SIGN_METHODS[tx_type],{**kwargs,'nonce':nonce + j})
+                for j,(tx_type,kwargs) in enumerate(legs)
+            ]
+        else:
+            futures = [
+                loop.run_in_executor(executor,self._sign,tx_type,kwargs,nonce + j)
+                for j,(tx_type,kwargs) in enumerate(legs)
+            ]
+        return [(tx_type,tx_info) for (tx_type,_),tx_info in zip(legs,await asyncio.gather(*futures))]
+
+    async def _sign_and_send(self,legs,nonce,send,endpoint):
+        '''
+        signs legs and dispatches send(signed) only after every transaction holding an earlier nonce was dispatched,
+        so sends leave in nonce order even when signatures complete out of order. must be called right after the nonce is allocated.
+        returns (signed, response)
+        '''
+        prev, turn = self.send_turn, asyncio.get_running_loop().create_future()
+        self.send_turn = turn
+        metrics = self.http_client.metrics
+        try:
+            start = time.perf_counter() if metrics is not None else 0
+            signed = await self._sign_legs(legs,nonce)
+            if metrics is not None:
+                metrics.record(endpoint,'sign',time.perf_counter() - start)
+            if prev is not None and not prev.done():
+                await prev
+            request = asyncio.ensure_future(send(signed))
+        finally:
+            turn.set_result(None)
+        return signed, await request
+
+    async def _fetch_nonce(self,account_idx,api_key_index):
+        return (await self.next_nonce(account_idx=account_idx,api_key_index=api_key_index))['nonce']
+
+    async def _nonce(self,n=1):
+        '''reserves n consecutive nonces, returns (first nonce, generation)'''
+        await self._ensure_signer()
+        return await self.nonce_manager.reserve(self.client.account_index,self.client.api_key_index,n=n)
+
+    async def _resync_nonce(self,generation=None):
+        await self.nonce_manager.resync(self.client.account_index,self.client.api_key_index,generation=generation)
+
+    async def _send_legs(self,legs,send,endpoint):
+        '''
+        allocates nonces for legs, then signs and sends them, see _sign_and_send. returns (signed, response)
+        any failure resyncs the nonce manager, as the unused nonces would leave a hole that gets every later nonce rejected.
+        a nonce rejection is re-signed with fresh nonces and resent once.
+        '''
+        for attempt in range(2):
+            nonce, generation = await self._nonce(n=len(legs))
+            try:
+                return await self._sign_and_send(legs,nonce,send,endpoint)
+            except Exception as e:
+                await self._resync_nonce(generation)
+                if attempt or not (isinstance(e,HTTPException) and NonceManager.is_nonce_error(e)):
+                    raise
+
+    async def submit(self,action):
+        '''
+        signs a single leg with a locally allocated nonce and sends it through sendTx.
+        a nonce rejection resyncs the nonce manager and the leg is re-signed and resent once, see _send_legs.
+        returns (tx_info, response)
+        '''
+        legs = self._legs([action])
+        tx_type, kwargs = legs[0]
+        [(_,tx_info)], res = await self._send_legs(
+            legs,
+            lambda signed: self.send_tx(tx_type=tx_type,tx_info=signed[0][1]),
+            endpoints['send_tx']['endpoint']
         )
-        
+        if self.state_manager is not None:
+            self.state_manager.on_ack(tx_type,kwargs)
+        return orjson.loads(tx_info), res
+
+    async def _batch_chunk(self,legs):
+        '''signs and sends up to BATCH_LIMIT legs in one sendTxBatch, see _send_legs. returns (signed, response)'''
+        return await self._send_legs(
+            legs,
+            lambda signed: self.send_tx_batch(
+                tx_types=[tx_type for tx_type,_ in signed],
+                tx_infos=[tx_info for _,tx_info in signed]
+            ),
+            endpoints['send_tx_batch']['endpoint']
+        )
+
+    async def batch(self,actions):
+        '''
+        signs every leg locally and submits them in as few sendTxBatch calls as possible.
+        actions > list of dicts, {'action':'create',**limit_order kwargs} or {'action':'cancel',**cancel_order kwargs}
+        returns one result per leg, in the order given: {'action','tx_type','tx_info','tx_hash','error'}
+        if a chunk fails, the chunks after it are not sent and BatchError is raised with the results of every leg:
+        the legs of earlier chunks were accepted (error None), the failed and unsent legs carry the exception in error.
+        '''
+        legs = self._legs(actions)
+        results = []
+        for i in range(0,len(actions),BATCH_LIMIT):
+            chunk = actions[i:i + BATCH_LIMIT]
+            try:
+                signed, res = await self._batch_chunk(legs[i:i + BATCH_LIMIT])
+            except Exception as e:
+                results += [
+                    {'action':action,'tx_type':tx_type,'tx_info':None,'tx_hash':None,'error':e}
+                    for action,(tx_type,_) in zip(actions[i:],legs[i:])
+                ]
+                raise BatchError(results,e) from e
+            if self.state_manager is not None:
+                for tx_type,kwargs in legs[i:i + BATCH_LIMIT]:
+                    self.state_manager.on_ack(tx_type,kwargs)
+            tx_hashes = res.get('tx_hash') or []
+            for j,(tx_type,tx_info) in enumerate(signed):
+                results.append({
+                    'action':chunk[j],
+                    'tx_type':tx_type,
+                    'tx_info':orjson.loads(tx_info),
+                    'tx_hash':tx_hashes[j] if j < len(tx_hashes) else None,
+                    'error':None
+                })
+        return results
+
+    async def batch_orders(self,orders):
+        '''orders > list of limit_order kwargs dicts'''
+        return await self.batch([{'action':'create',**order} for order in orders])
+
+    async def batch_cancel(self,cancels):
+        '''cancels > list of cancel_order kwargs dicts'''
+        return await self.batch([{'action':'cancel',**cancel} for cancel in cancels])
+
     async def status(self):
         endpoint = dict(endpoints['status'])
         return await self.http_client.request(
@@ -406,17 +894,27 @@ class Lighter():
         return await self.http_client.request(
             **endpoint,
         )
-    
+
+    def iter_public_pools(self,limit=100,prefetch=1,max_items=None,**kwargs):
+        '''async iterator over every public pool, following the index param and prefetching the next page'''
+        return paginate(
+            lambda index=0: self.public_pools(index=index,limit=limit,**kwargs),
+            'public_pools',
+            index_params('index'),
+            limit=limit,
+            prefetch=prefetch,
+            max_items=max_items
+        )
+
     async def account_active_orders(self,ticker,account_idx=None,is_index=False,**kwargs):
+        await self._ensure_signer()
         account_idx = account_idx or self.account_idx
         endpoint = dict(endpoints['account_active_orders'])
         market_id = self.ticker_to_idx[ticker] if not is_index else ticker
         endpoint['params'] = {
             'account_index':account_idx,
             'market_id':market_id,
-            'auth':self.client.create_auth_token_with_expiry(
-                SignerClient.DEFAULT_10_MIN_AUTH_EXPIRY
-            )
+            'auth':self._auth_token()
         }
         return await self.http_client.request(
             **endpoint,
@@ -437,6 +935,20 @@ class Lighter():
             **endpoint,
         )
 
+    def iter_account_orders(self,ticker,account_idx=None,is_index=False,limit=100,prefetch=1,max_items=None):
+        '''
+        async iterator over every order of the account in a market, following next_cursor and prefetching the next page.
+        async for order in lighter.iter_account_orders('ETH'): ...
+        '''
+        return paginate(
+            lambda cursor=None: self.account_orders(ticker,account_idx=account_idx,cursor=cursor,is_index=is_index,limit=limit),
+            'orders',
+            cursor_params,
+            limit=limit,
+            prefetch=prefetch,
+            max_items=max_items
+        )
+
     async def exchange_stats(self):
         endpoint = dict(endpoints['exchange_stats'])
         return await self.http_client.request(
@@ -452,7 +964,7 @@ class Lighter():
             **endpoint,
         )
 
-    async def orderbook_orders(self,ticker,limit=100,is_index=False,**kwargs):
+    async def orderbook_orders(self,ticker,limit=100,is_index=False,columnar=False,**kwargs):
         endpoint = dict(endpoints['orderbook_orders'])
         market_id = self.ticker_to_idx[ticker] if not is_index else ticker
         endpoint['params'] = {
@@ -460,9 +972,14 @@ class Lighter():
             'limit':limit,
             **kwargs
         }
-        return await self.http_client.request(
+        res = await self.http_client.request(
             **endpoint,
         )
+        if columnar:
+            from lighter_sdk.columnar import to_columns
+            res['bids'] = to_columns(res.get('bids') or [],'orders')
+            res['asks'] = to_columns(res.get('asks') or [],'orders')
+        return res
 
     async def orderbooks(self,ticker=None,is_index=False):
         endpoint = dict(endpoints['orderbooks'])
@@ -473,7 +990,7 @@ class Lighter():
             **endpoint,
         )
 
-    async def recent_trades(self,ticker,limit=100,is_index=False,**kwargs):
+    async def recent_trades(self,ticker,limit=100,is_index=False,columnar=False,**kwargs):
         endpoint = dict(endpoints['recent_trades'])
         market_id = self.ticker_to_idx[ticker] if not is_index else ticker
         endpoint['params'] = {
@@ -481,11 +998,15 @@ class Lighter():
             'limit':limit,
             **kwargs
         }
-        return await self.http_client.request(
+        res = await self.http_client.request(
             **endpoint,
         )
+        if columnar:
+            from lighter_sdk.columnar import to_columns
+            res['trades'] = to_columns(res.get('trades') or [],'trades')
+        return res
     
-    async def trades(self,ticker=None,limit=100,sort_by='timestamp',is_index=False,**kwargs):
+    async def trades(self,ticker=None,limit=100,sort_by='timestamp',is_index=False,columnar=False,**kwargs):
         endpoint = dict(endpoints['trades'])
         endpoint['params'] = {
             'limit':limit,
@@ -494,10 +1015,25 @@ class Lighter():
         }
         if ticker is not None:
             market_id = self.ticker_to_idx[ticker] if not is_index else ticker
-            params.update({'market_id':market_id})
-        return await self.http_client.request(
+            endpoint['params'].update({'market_id':market_id})
+        res = await self.http_client.request(
             **endpoint,
         )
+        if columnar:
+            from lighter_sdk.columnar import to_columns
+            res['trades'] = to_columns(res.get('trades') or [],'trades')
+        return res
+
+    def iter_trades(self,ticker=None,limit=100,sort_by='timestamp',is_index=False,prefetch=1,max_items=None,**kwargs):
+        '''async iterator over trades, following next_cursor and prefetching the next page'''
+        return paginate(
+            lambda **cursor: self.trades(ticker=ticker,limit=limit,sort_by=sort_by,is_index=is_index,**cursor,**kwargs),
+            'trades',
+            cursor_params,
+            limit=limit,
+            prefetch=prefetch,
+            max_items=max_items
+        )
 
     async def accounttxs(self,account_idx=None,by='account_index',limit=100,**kwargs):
         account_idx = account_idx or self.account_idx
@@ -512,6 +1048,17 @@ class Lighter():
             **endpoint,
         )
 
+    def iter_accounttxs(self,account_idx=None,by='account_index',limit=100,prefetch=1,max_items=None,**kwargs):
+        '''async iterator over the account's txs, following sequence_index and prefetching the next page'''
+        return paginate(
+            lambda **index: self.accounttxs(account_idx=account_idx,by=by,limit=limit,**index,**kwargs),
+            'txs',
+            index_params('sequence_index',descending=True),
+            limit=limit,
+            prefetch=prefetch,
+            max_items=max_items
+        )
+
     async def blocktxs(self,commitment=None,height=None):
         endpoint = dict(endpoints['blocktxs'])
         endpoint['params'] = {
@@ -536,6 +1083,29 @@ class Lighter():
             **endpoint,
         )
 
+    async def send_tx(self,tx_type,tx_info,**kwargs):
+        endpoint = dict(endpoints['send_tx'])
+        endpoint['data'] = {
+            'tx_type':tx_type,
+            'tx_info':tx_info,
+            **kwargs
+        }
+        return await self.http_client.request(
+            **endpoint,
+            headers={"content-type": "application/x-www-form-urlencoded"}
+        )
+
+    async def send_tx_batch(self,tx_types,tx_infos):
+        endpoint = dict(endpoints['send_tx_batch'])
+        endpoint['data'] = {
+            'tx_types':json.dumps(tx_types),
+            'tx_infos':json.dumps(tx_infos)
+        }
+        return await self.http_client.request(
+            **endpoint,
+            headers={"content-type": "application/x-www-form-urlencoded"}
+        )
+
     async def tx(self):
         pass 
     
@@ -574,13 +1144,27 @@ class Lighter():
             **endpoint,
         )
 
+    def iter_blocks(self,start=None,sort='asc',limit=100,prefetch=1,max_items=None):
+        '''async iterator over blocks from height start (default: the first/latest block for sort asc/desc), prefetching the next page'''
+        def fetch(index=start):
+            params = {'sort':sort} if index is None else {'sort':sort,'index':index}
+            return self.blocks(limit=limit,**params)
+        return paginate(
+            fetch,
+            'blocks',
+            index_params('height',descending=sort == 'desc'),
+            limit=limit,
+            prefetch=prefetch,
+            max_items=max_items
+        )
+
     async def current_height(self):  
         endpoint = dict(endpoints['current_height'])
         return await self.http_client.request(
             **endpoint,
         )
 
-    async def fundings(self,ticker,resolution='1h',start=None,end=None,count_back=2,is_index=False,**kwargs):
+    async def fundings(self,ticker,resolution='1h',start=None,end=None,count_back=2,is_index=False,columnar=False,**kwargs):
         market_id = self.ticker_to_idx[ticker] if not is_index else ticker
         start = start or int(datetime.now().timestamp() - 60 * 60 * 24)
         end = end or int(datetime.now().timestamp())
@@ -593,11 +1177,15 @@ class Lighter():
             'count_back':count_back,
             **kwargs
         }
-        return await self.http_client.request(
+        res = await self.http_client.request(
             **endpoint,
         )
+        if columnar:
+            from lighter_sdk.columnar import to_columns
+            res['fundings'] = to_columns(res.get('fundings') or [],'fundings')
+        return res
 
-    async def candlesticks(self,ticker,resolution='1h',start=None,end=None,count_back=2,set_timestamp_to_end=False,is_index=False,**kwargs):
+    async def candlesticks(self,ticker,resolution='1h',start=None,end=None,count_back=2,set_timestamp_to_end=False,is_index=False,columnar=False,**kwargs):
         market_id = self.ticker_to_idx[ticker] if not is_index else ticker
         start = start or int(datetime.now().timestamp() - 60 * 60 * 24)
         end = end or int(datetime.now().timestamp())
@@ -611,9 +1199,40 @@ class Lighter():
             'set_timestamp_to_end':set_timestamp_to_end,
             **kwargs
         }
-        return await self.http_client.request(
+        res = await self.http_client.request(
             **endpoint,
         )
+        if columnar:
+            from lighter_sdk.columnar import to_columns
+            res['candlesticks'] = to_columns(res.get('candlesticks') or [],'candlesticks')
+        return res
+
+    async def history(self,kind,tickers,resolution='1h',start=None,end=None,store=None,concurrency=8,is_index=False):
+        '''
+        bulk candlesticks/fundings download across tickers, split into server-sized windows and fetched with bounded concurrency.
+        store > optional HistoryStore (or a directory path), only the windows missing from each series (head, tail and gaps, packed into shared windows) are fetched and new bars are persisted. windows fetched without bars are remembered and not requested again.
+        returns {ticker: [row tuples]}, see HistoryStore.FIELDS[kind]. a market with a failed window maps to the exception, its other windows are still persisted.
+        '''
+        store = HistoryStore(store) if isinstance(store,str) else store
+        return await download_history(
+            self,
+            kind,
+            tickers,
+            resolution=resolution,
+            start=start,
+            end=end,
+            store=store,
+            concurrency=concurrency,
+            is_index=is_index
+        )
+
+    async def market_snapshot(self,tickers=None,depth=1,concurrency=32,is_index=False):
+        '''
+        top depth levels of tickers (default: every market) fetched concurrently, at most concurrency requests in flight.
+        returns arrays aligned with tickers: bid, ask, bid_size, ask_size, (n, depth) level arrays and per market fetch timestamps (ms), see snapshot.market_snapshot
+        '''
+        from lighter_sdk.snapshot import market_snapshot
+        return await market_snapshot(self,tickers=tickers,depth=depth,concurrency=concurrency,is_index=is_index)
 
     async def layer2BasicInfo(self):
         endpoint = dict(endpoints['layer2BasicInfo'])
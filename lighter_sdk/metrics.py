@@ -0,0 +1,103 @@
+import bisect
+
+#upper bounds (s) of the histogram buckets, doubling from 100us to ~13s, plus an overflow bucket
+BUCKETS = tuple(0.0001 * 2 ** i for i in range(18))
+
+class Histogram:
+    """
+    A fixed-bucket latency histogram. Recording is a bisect and an increment, with no allocation.
+
+    Args:
+        buckets (tuple, optional): The sorted bucket upper bounds in seconds. Defaults to `BUCKETS`.
+    """
+    __slots__ = ('buckets', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """The upper bound of the bucket holding the q-th (0-100) percentile, `max` for the overflow bucket."""
+        if not self.count:
+            return 0.
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self, raw=False):
+        snapshot = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+        if raw:
+            snapshot['buckets'] = list(zip(self.buckets + (float('inf'),), self.counts))
+        return snapshot
+
+
+class LatencyRecorder:
+    """
+    Per-endpoint latency histograms by stage ('sign', 'queue', 'network', 'decode', 'total') and
+    retry/error counters. Attach it to `HTTPClient(metrics=...)`; without one, no timing is taken.
+
+    Args:
+        buckets (tuple, optional): The histogram bucket upper bounds in seconds. Defaults to `BUCKETS`.
+        sink (callable, optional): Called with (endpoint, stage, seconds) on every recording, e.g. to forward to a metrics backend. Defaults to None.
+    """
+
+    def __init__(self, buckets=BUCKETS, sink=None):
+        self.buckets = buckets
+        self.sink = sink
+        self.histograms = {}
+        self.counters = {}
+
+    def record(self, endpoint, stage, seconds):
+        histogram = self.histograms.get((endpoint, stage))
+        if histogram is None:
+            histogram = self.histograms[(endpoint, stage)] = Histogram(self.buckets)
+        histogram.record(seconds)
+        if self.sink is not None:
+            self.sink(endpoint, stage, seconds)
+
+    def count(self, endpoint, event, n=1):
+        """Increment an event counter, e.g. 'retries' or 'errors'."""
+        key = (endpoint, event)
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def snapshot(self, raw=False):
+        """
+        Args:
+            raw (bool, optional): Whether to include the bucket counts of every histogram. Defaults to False.
+
+        Returns:
+            dict: endpoint -> {'stages': {stage: {'count', 'mean', 'max', 'p50', 'p90', 'p99'}}, 'retries', 'errors', ...} in seconds.
+        """
+        snapshot = {}
+        for (endpoint, stage), histogram in self.histograms.items():
+            entry = snapshot.setdefault(endpoint, {'stages': {}, 'retries': 0, 'errors': 0})
+            entry['stages'][stage] = histogram.snapshot(raw=raw)
+        for (endpoint, event), n in self.counters.items():
+            entry = snapshot.setdefault(endpoint, {'stages': {}, 'retries': 0, 'errors': 0})
+            entry[event] = n
+        return snapshot
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
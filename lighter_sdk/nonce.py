@@ -0,0 +1,95 @@
+import asyncio
+
+#the exchange's error code for a rejected nonce
+INVALID_NONCE_CODE = 21104
+
+class NonceManager:
+    """
+    An in-process nonce allocator keyed on (account_index, api_key_index). Each key is seeded once
+    from the exchange, after which nonces are handed out locally so that many transactions can be
+    signed and in flight at the same time.
+
+    Args:
+        fetch (callable): A coroutine function `fetch(account_index, api_key_index)` returning the next
+            nonce the exchange expects for that key.
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.nonces = {}
+        self.locks = {}
+        self.generations = {}
+
+    def _lock(self, key):
+        if key not in self.locks:
+            self.locks[key] = asyncio.Lock()
+        return self.locks[key]
+
+    async def next(self, account_index, api_key_index, n=1):
+        """
+        Reserve `n` consecutive nonces and return the first one.
+
+        Args:
+            account_index (int): The account the transactions are signed for.
+            api_key_index (int): The api key the transactions are signed with.
+            n (int, optional): The number of consecutive nonces to reserve. Defaults to 1.
+
+        Returns:
+            int: The first reserved nonce.
+        """
+        nonce, _ = await self.reserve(account_index, api_key_index, n)
+        return nonce
+
+    async def reserve(self, account_index, api_key_index, n=1):
+        """
+        Like `next`, but also returns the generation the nonces were allocated in, which is bumped by
+        every resync. Pass it to `resync` so a late failure from before a resync does not reseed again.
+
+        Returns:
+            tuple: The first reserved nonce and its generation.
+        """
+        key = (account_index, api_key_index)
+        while key not in self.nonces:
+            lock = self._lock(key)
+            async with lock:
+                if key not in self.nonces:
+                    self.nonces[key] = await self.fetch(account_index, api_key_index)
+        nonce = self.nonces[key]
+        self.nonces[key] = nonce + n
+        return nonce, self.generations.get(key, 0)
+
+    async def resync(self, account_index, api_key_index, generation=None):
+        """
+        Drop the local nonce for a key and reseed it from the exchange. Concurrent callers share a
+        single reseed; allocations made while it is in flight wait for it.
+
+        Args:
+            account_index (int): The account the transactions are signed for.
+            api_key_index (int): The api key the transactions are signed with.
+            generation (int, optional): The generation of the failed nonce, from `reserve`. If a resync
+                happened since, the key is already reseeded past it and is left alone, so nonces in
+                flight are not handed out again. Defaults to None, always reseeding.
+        """
+        key = (account_index, api_key_index)
+        if generation is not None and generation != self.generations.get(key, 0):
+            return
+        lock = self._lock(key)
+        if lock.locked():
+            async with lock:
+                return
+        self.nonces.pop(key, None)
+        self.generations[key] = self.generations.get(key, 0) + 1
+        async with lock:
+            if key not in self.nonces:
+                self.nonces[key] = await self.fetch(account_index, api_key_index)
+
+    @staticmethod
+    def is_nonce_error(exc):
+        """
+        Whether a rejected send failed on its nonce, judged on the exchange's error body only (the
+        exception's request args hold the signed tx, which always has a nonce field).
+        """
+        message = getattr(exc, 'message', None)
+        if isinstance(message, dict):
+            return message.get('code') == INVALID_NONCE_CODE or 'nonce' in str(message.get('message', '')).lower()
+        return isinstance(message, str) and 'nonce' in message.lower()
@@ -0,0 +1,69 @@
+import asyncio
+
+async def paginate(fetch, items_key, next_params, limit=None, prefetch=1, max_items=None):
+    """
+    Iterate over the items of a paginated endpoint. The next page is fetched in the background
+    while the caller consumes the current one, with at most `prefetch` pages buffered. Leaving the
+    loop early (or closing the generator) cancels the outstanding fetch.
+
+    Args:
+        fetch (callable): A coroutine function `fetch(**params)` returning one page. Called with no params for the first page.
+        items_key (str): The key of the item list in a page, e.g. 'orders'.
+        next_params (callable): `next_params(page, items)` returning the params of the next page, or None on the last page.
+        limit (int, optional): The page size requested. A shorter page is taken as the last one. Defaults to None.
+        prefetch (int, optional): The maximum number of pages buffered ahead of the caller. Defaults to 1.
+        max_items (int, optional): Stop after yielding this many items. Defaults to None (all).
+
+    Yields:
+        dict: The items of every page, in order.
+    """
+    queue = asyncio.Queue(maxsize=prefetch)
+
+    async def producer():
+        params = {}
+        try:
+            while params is not None:
+                page = await fetch(**params)
+                items = page.get(items_key) or []
+                last = not items or (limit is not None and len(items) < limit)
+                params = None if last else next_params(page, items)
+                await queue.put(items)
+            await queue.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+
+    task = asyncio.create_task(producer())
+    count = 0
+    try:
+        while True:
+            items = await queue.get()
+            if items is None:
+                return
+            if isinstance(items, Exception):
+                raise items
+            for item in items:
+                yield item
+                count += 1
+                if max_items is not None and count >= max_items:
+                    return
+    finally:
+        task.cancel()
+
+
+def cursor_params(page, items):
+    cursor = page.get('next_cursor')
+    return {'cursor': cursor} if cursor else None
+
+
+def index_params(field, descending=False):
+    """
+    Next-page params for endpoints paged by an `index` param, continuing one past the last item's
+    `field` in the direction the page is sorted (`descending` breaks the tie for one-item pages).
+    """
+    def next_params(page, items):
+        first, last = items[0][field], items[-1][field]
+        desc = first > last if first != last else descending
+        return {'index': last - 1 if desc else last + 1}
+    return next_params
@@ -0,0 +1,172 @@
+import logging
+
+from lighter_sdk.lighter import BatchError
+
+class QuoteManager:
+    """
+    Maintains quote ladders by diffing the desired levels against the orders already resting, and
+    sending only the difference: new levels are created, changed levels are modified in place (an
+    atomic cancel-replace), dropped levels are cancelled, and unchanged levels cost nothing. All the
+    changes of an `update` go out in one signed `sendTxBatch`.
+
+    Each level is an order tracked by its client order index, which the exchange also accepts in
+    place of the order index for cancels and modifies. A level with an action in flight is left
+    alone until the action is acked, so overlapping updates never send the same change twice.
+
+    Args:
+        lighter (Lighter): An initialized client. If it tracks state (`track_state`), filled or
+            externally cancelled levels are dropped from the ladder and re-quoted.
+        tif (str, optional): The time in force of new orders. Defaults to 'GTC'.
+        start_client_index (int, optional): The first client order index handed out. Defaults to None, drawing
+            from the client's `next_client_order_index` so that other orders of the client never share an index.
+    """
+
+    def __init__(self, lighter, tif='GTC', start_client_index=None):
+        self.lighter = lighter
+        self.tif = tif
+        self.next_client_index = start_client_index
+        #market_id -> {(is_ask, level): {'client_order_index', 'price', 'size', 'status'}}
+        self.levels = {}
+        self.sent = {'create': 0, 'modify': 0, 'cancel': 0, 'unchanged': 0, 'in_flight': 0}
+
+    def _client_index(self):
+        if self.next_client_index is None:
+            return self.lighter.next_client_order_index()
+        self.next_client_index += 1
+        return self.next_client_index - 1
+
+    def ladder(self, ticker, is_index=False):
+        instrument = self.lighter.instruments.get(ticker, is_index)
+        return self.levels.get(instrument.market_id, {})
+
+    def _drop_gone(self, market_id, levels):
+        state = self.lighter.state_manager
+        if state is None:
+            return
+        for key, level in list(levels.items()):
+            if level['status'] == 'live' and state.get_order(market_id, level['client_order_index']) is None:
+                del levels[key]
+
+    def diff(self, ticker, bids=(), asks=(), is_index=False):
+        """
+        Compute the actions that move a market's resting ladder to the desired one, best level first.
+        Prices and sizes are compared after quantization, so sub-tick changes send nothing.
+
+        Args:
+            ticker (str): The ticker (or market id, if `is_index`).
+            bids (list, optional): The desired (price, size) bid levels, best first. Defaults to ().
+            asks (list, optional): The desired (price, size) ask levels, best first. Defaults to ().
+            is_index (bool, optional): Whether `ticker` is a market id. Defaults to False.
+
+        Returns:
+            list: (level key, batch action, quantized (price, size)) tuples, the target None for cancels.
+        """
+        instrument = self.lighter.instruments.get(ticker, is_index)
+        market_id = instrument.market_id
+        levels = self.levels.setdefault(market_id, {})
+        self._drop_gone(market_id, levels)
+        desired = {}
+        for is_ask, ladder in ((False, bids), (True, asks)):
+            for i, (price, size) in enumerate(ladder):
+                price_int, base_int, _ = instrument.quantize(price, size)
+                desired[(is_ask, i)] = (price_int, base_int)
+
+        changes = []
+        for key in sorted(set(desired) | set(levels), key=lambda key: (key[1], key[0])):
+            level = levels.get(key)
+            if level is not None and level['status'] != 'live':
+                self.sent['in_flight'] += 1
+                continue
+            target = desired.get(key)
+            if target is None:
+                action = {'action': 'cancel', 'order_id': level['client_order_index']}
+            elif level is None:
+                action = {
+                    'action': 'create',
+                    'amount': -target[1] / instrument.size_scale if key[0] else target[1] / instrument.size_scale,
+                    'price': target[0] / instrument.price_scale,
+                    'client_order_index': self._client_index(),
+                    'tif': self.tif,
+                }
+            elif (level['price'], level['size']) != target:
+                action = {
+                    'action': 'modify',
+                    'order_id': level['client_order_index'],
+                    'amount': target[1] / instrument.size_scale,
+                    'price': target[0] / instrument.price_scale,
+                }
+            else:
+                self.sent['unchanged'] += 1
+                continue
+            changes.append((key, {'ticker': market_id, 'is_index': True, **action}, target))
+        return changes
+
+    async def update(self, quotes, is_index=False):
+        """
+        Move every given market to its desired ladder in a single batch.
+
+        Args:
+            quotes (dict): ticker -> {'bids': [(price, size)], 'asks': [(price, size)]}, best levels first.
+                Markets not given are left as they are; pass empty ladders to pull a market's quotes.
+            is_index (bool, optional): Whether the keys of `quotes` are market ids. Defaults to False.
+
+        Returns:
+            list: The batch results of the actions sent, empty if nothing changed.
+        """
+        changes = []
+        for ticker, ladder in quotes.items():
+            market_id = self.lighter.instruments.get(ticker, is_index).market_id
+            changes += [
+                (market_id, key, action, target)
+                for key, action, target in self.diff(ticker, ladder.get('bids', ()), ladder.get('asks', ()), is_index)
+            ]
+        if not changes:
+            return []
+
+        previous = {}
+        for market_id, key, action, target in changes:
+            levels = self.levels[market_id]
+            previous[(market_id, key)] = levels.get(key)
+            levels[key] = {
+                'client_order_index': action.get('client_order_index', action.get('order_id')),
+                'price': target[0] if target else None,
+                'size': target[1] if target else None,
+                'status': f"{action['action']}_pending",
+            }
+        try:
+            results = await self.lighter.batch([action for _, _, action, _ in changes])
+        except BatchError as e:
+            failed = sum(result['error'] is not None for result in e.results)
+            logging.warning(f"quote update failed part way, {failed} of {len(changes)} levels rolled back: {e.error}")
+            self._settle(changes, previous, e.results)
+            raise
+        except Exception as e:
+            logging.warning(f"quote update failed, {len(changes)} levels rolled back: {e}")
+            self._settle(changes, previous, [{'error': e}] * len(changes))
+            raise
+        self._settle(changes, previous, results)
+        return results
+
+    def _settle(self, changes, previous, results):
+        """
+        Apply the per-leg batch results to the ladders: accepted creates and modifies go live, accepted
+        cancels drop their level, and the levels of failed or unsent legs are rolled back.
+        """
+        for (market_id, key, action, _), result in zip(changes, results):
+            levels = self.levels[market_id]
+            if result['error'] is not None:
+                old = previous[(market_id, key)]
+                if old is None:
+                    levels.pop(key, None)
+                else:
+                    levels[key] = old
+                continue
+            self.sent[action['action']] += 1
+            if action['action'] == 'cancel':
+                levels.pop(key, None)
+            else:
+                levels[key]['status'] = 'live'
+
+    async def cancel_all(self):
+        """Cancel every level of every market this manager quotes."""
+        return await self.update({market_id: {} for market_id in self.levels}, is_index=True)
@@ -0,0 +1,147 @@
+import time
+import heapq
+import asyncio
+import itertools
+
+from collections import defaultdict
+
+#endpoint -> (endpoint class, priority lane, weight). lower lanes are served first.
+ENDPOINT_CLASSES = {
+    '/api/v1/sendTx': ('order', 0, 1),
+    '/api/v1/sendTxBatch': ('order', 0, 1),
+    '/api/v1/nextNonce': ('order', 0, 1),
+    '/api/v1/accountActiveOrders': ('account', 1, 1),
+    '/api/v1/accountInactiveOrders': ('account', 1, 1),
+    '/api/v1/accountOrders': ('account', 1, 1),
+    '/api/v1/account': ('account', 1, 1),
+    '/api/v1/accountTxs': ('account', 1, 1),
+    '/api/v1/pnl': ('account', 1, 1),
+}
+DEFAULT_CLASS = ('data', 2, 1)
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `rate` tokens per second, holding at most `capacity`.
+
+    Args:
+        rate (float): The refill rate in tokens per second.
+        capacity (float, optional): The bucket size, i.e. the allowed burst. Defaults to `rate`.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, n=1):
+        self.refill()
+        return 0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n=1):
+        self.tokens -= n
+
+    async def acquire(self, n=1):
+        while (wait := self.wait_time(n)) > 0:
+            await asyncio.sleep(wait)
+        self.take(n)
+
+
+class RequestScheduler:
+    """
+    A client-side rate limiter with priority lanes. Every request draws from a shared bucket that
+    models the exchange budget, and optionally from a per-class bucket. When the shared budget is
+    exhausted, queued requests are released lowest lane first, so order actions go ahead of
+    account reads, which go ahead of market data.
+
+    Args:
+        rate (float): The shared budget refill rate in weight per second.
+        burst (float, optional): The shared budget capacity. Defaults to `rate`.
+        class_limits (dict, optional): Per-class `(rate, burst)` limits, e.g. `{'data': (5, 10)}`. Defaults to None.
+        classes (dict, optional): Overrides of `ENDPOINT_CLASSES`, endpoint -> (class, lane, weight). Defaults to None.
+        remaining_header (str, optional): The response header carrying the remaining server-side budget. Defaults to 'x-ratelimit-remaining'.
+    """
+
+    def __init__(
+        self,
+        rate,
+        burst=None,
+        class_limits=None,
+        classes=None,
+        remaining_header='x-ratelimit-remaining'
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.class_buckets = {cls: TokenBucket(*limit) for cls, limit in (class_limits or {}).items()}
+        self.classes = {**ENDPOINT_CLASSES, **(classes or {})}
+        self.remaining_header = remaining_header
+        self.waiters = []
+        self.seq = itertools.count()
+        self.queue_depth = defaultdict(int)
+        self.served = defaultdict(int)
+        self.throttled = 0
+        self.task = None
+
+    def classify(self, endpoint):
+        return self.classes.get(endpoint, DEFAULT_CLASS)
+
+    async def acquire(self, endpoint):
+        """Wait until a request to `endpoint` may be sent."""
+        cls, lane, weight = self.classify(endpoint)
+        class_bucket = self.class_buckets.get(cls)
+        if class_bucket is not None:
+            await class_bucket.acquire(weight)
+        if not self.waiters and self.bucket.wait_time(weight) == 0:
+            self.bucket.take(weight)
+            self.served[cls] += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (lane, next(self.seq), cls, weight, future))
+        self.queue_depth[cls] += 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self.waiters:
+            lane, _, cls, weight, future = self.waiters[0]
+            if future.done():
+                heapq.heappop(self.waiters)
+                self.queue_depth[cls] -= 1
+                continue
+            wait = self.bucket.wait_time(weight)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self.waiters)
+            self.queue_depth[cls] -= 1
+            self.bucket.take(weight)
+            self.served[cls] += 1
+            future.set_result(None)
+
+    def update(self, status_code, headers):
+        """Align the local budget with the server's view after a response."""
+        remaining = headers.get(self.remaining_header) if headers else None
+        if remaining is not None:
+            try:
+                self.bucket.refill()
+                self.bucket.tokens = min(self.bucket.tokens, float(remaining))
+            except ValueError:
+                pass
+        if status_code == 429:
+            self.throttled += 1
+            self.bucket.refill()
+            self.bucket.tokens = min(self.bucket.tokens, 0)
+
+    def metrics(self):
+        return {
+            'queue_depth': dict(self.queue_depth),
+            'served': dict(self.served),
+            'throttled': self.throttled,
+            'tokens': self.bucket.tokens,
+        }
@@ -0,0 +1,157 @@
+import time
+import struct
+import asyncio
+import httpx
+import orjson
+
+from collections import deque
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+LENGTH = struct.Struct('<I')
+
+#headers describing the wire encoding, not the decoded content we store
+WIRE_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+#query parameters that differ between otherwise identical requests: freshly minted auth tokens, and the
+#time windows candlesticks, fundings and pnl default to from the current time
+VOLATILE_PARAMS = ('auth', 'start_timestamp', 'end_timestamp')
+
+class ReplayMiss(LookupError):
+    '''a request without a recorded response, never retried'''
+
+
+def write_record(f, header, body, content):
+    """
+    Appends a record: a length-prefixed JSON header, then the request body and the response content as
+    length-prefixed raw bytes.
+    """
+    header = orjson.dumps(header)
+    f.write(b''.join((LENGTH.pack(len(header)), header, LENGTH.pack(len(body)), body, LENGTH.pack(len(content)), content)))
+
+def read_frame(f):
+    prefix = f.read(LENGTH.size)
+    if len(prefix) < LENGTH.size:
+        return None
+    length = LENGTH.unpack(prefix)[0]
+    frame = f.read(length)
+    return frame if len(frame) == length else None
+
+def iter_records(path):
+    """
+    Yields the records of a log in order, each its header with the raw `body` and `content` bytes added.
+    A truncated trailing record, e.g. after a crash, is ignored.
+    """
+    with open(path, 'rb') as f:
+        while True:
+            frames = [read_frame(f) for _ in range(3)]
+            if None in frames:
+                return
+            header, body, content = frames
+            yield {**orjson.loads(header), 'body': body, 'content': content}
+
+def request_key(method, url, volatile=VOLATILE_PARAMS):
+    parts = urlsplit(str(url))
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k not in volatile))
+    return f'{method} {parts.path}?{query}'
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that forwards requests and appends every request/response pair to a log of
+    length-prefixed records, for `ReplayTransport`. Each record is a small JSON header (timing, method,
+    url, status, headers) followed by the request and response bodies as raw bytes, so payloads are
+    stored byte for byte without any escaping overhead.
+
+    Args:
+        path (str): The log file, appended to.
+        transport (httpx.AsyncBaseTransport, optional): The transport doing the real I/O. Defaults to `httpx.AsyncHTTPTransport()`.
+    """
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.file = open(path, 'ab')
+
+    async def handle_async_request(self, request):
+        sent = time.time()
+        response = await self.transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        elapsed = time.time() - sent
+        write_record(self.file, {
+            'ts': sent,
+            'elapsed': elapsed,
+            'method': request.method,
+            'url': str(request.url),
+            'status': response.status_code,
+            'headers': [(k.decode('latin-1'), v.decode('latin-1')) for k, v in response.headers.raw],
+        }, request.content, content)
+        self.file.flush()
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=[(k, v) for k, v in response.headers.raw if k.decode('latin-1').lower() not in WIRE_HEADERS],
+            content=content,
+            request=request
+        )
+
+    async def aclose(self):
+        self.file.close()
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport serving the responses of a `RecordingTransport` log without any network.
+    Requests are matched on method, path and query (ignoring the `volatile` params), and repeated
+    requests get the recorded responses in their original order.
+
+    With `speed`, the session's original timing is reproduced: the clock starts at the first replayed
+    request, and each response is held until the time it completed in the recording (the gaps between
+    requests and the latency), divided by `speed`. A client slower than the recording is not delayed.
+
+    Args:
+        path (str): The log file.
+        speed (float, optional): The replay speed relative to the recording, e.g. 1 for real time, None for no delay. Defaults to None.
+        strict (bool, optional): Raise `ReplayMiss` for requests without a remaining recorded response, instead of repeating the last one. Defaults to False.
+        volatile (tuple, optional): The query params ignored when matching requests. Defaults to `VOLATILE_PARAMS`.
+    """
+
+    def __init__(self, path, speed=None, strict=False, volatile=VOLATILE_PARAMS):
+        self.speed = speed
+        self.strict = strict
+        self.volatile = volatile
+        self.responses = {}
+        self.last = {}
+        self.recorded_start = None
+        for record in iter_records(path):
+            self.responses.setdefault(request_key(record['method'], record['url'], volatile), deque()).append(record)
+            self.recorded_start = record['ts'] if self.recorded_start is None else min(self.recorded_start, record['ts'])
+        self.replay_start = None
+        self.served = 0
+        self.missed = 0
+
+    async def handle_async_request(self, request):
+        if self.replay_start is None:
+            self.replay_start = time.monotonic()
+        key = request_key(request.method, request.url, self.volatile)
+        queue = self.responses.get(key)
+        if queue:
+            record = self.last[key] = queue.popleft()
+        elif key in self.last and not self.strict:
+            record = self.last[key]
+        else:
+            self.missed += 1
+            raise ReplayMiss(f'no recorded response for {key}')
+        if self.speed:
+            due = self.replay_start + (record['ts'] + record['elapsed'] - self.recorded_start) / self.speed
+            await asyncio.sleep(max(0, due - time.monotonic()))
+        self.served += 1
+        return httpx.Response(
+            status_code=record['status'],
+            headers=[(k, v) for k, v in record['headers'] if k.lower() not in WIRE_HEADERS],
+            content=record['content'],
+            request=request
+        )
+
+    def remaining(self):
+        return sum(len(queue) for queue in self.responses.values())
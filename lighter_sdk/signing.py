@@ -0,0 +1,46 @@
+from concurrent.futures import ProcessPoolExecutor
+
+#the worker process's own signer, see SigningProcessPool
+_signer = None
+
+def _init_worker(url, private_key, chain_id, account_index, api_key_index):
+    global _signer
+    from lighter import SignerClient
+    _signer = SignerClient(
+        url=url,
+        private_key=private_key,
+        chain_id=chain_id,
+        account_index=account_index,
+        api_key_index=api_key_index
+    )
+
+def sign_in_worker(method, kwargs):
+    tx_info = getattr(_signer, method)(**kwargs)
+    if isinstance(tx_info, tuple):
+        tx_info, err = tx_info
+        if err:
+            raise ValueError(err)
+    return tx_info
+
+
+class SigningProcessPool(ProcessPoolExecutor):
+    """
+    A process pool whose workers each hold a `SignerClient` for one api key, so that transactions
+    are signed in parallel without sharing the interpreter with the event loop. Only the signer
+    method name and its keyword arguments cross the process boundary.
+
+    Args:
+        url (str): The exchange url the signers are created for.
+        private_key (str): The api key private key.
+        chain_id (int): The chain id signed over.
+        account_index (int): The account the api key belongs to.
+        api_key_index (int): The api key index.
+        max_workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+    """
+
+    def __init__(self, url, private_key, chain_id, account_index, api_key_index, max_workers=None):
+        super().__init__(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(url, private_key, chain_id, account_index, api_key_index)
+        )
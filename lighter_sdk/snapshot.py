@@ -0,0 +1,79 @@
+import time
+import asyncio
+import logging
+import numpy as np
+
+#the most orders orderBookOrders returns per side
+MAX_ORDERS = 250
+
+def aggregate_levels(orders):
+    """Sum the resting orders of one side, best first, into [price, size] levels."""
+    levels = []
+    for order in orders:
+        price = float(order['price'])
+        size = float(order['remaining_base_amount'])
+        if levels and levels[-1][0] == price:
+            levels[-1][1] += size
+        else:
+            levels.append([price, size])
+    return levels
+
+async def market_snapshot(lighter, tickers=None, depth=1, concurrency=32, is_index=False):
+    """
+    Fetch the top `depth` price levels of many order books at once, with at most `concurrency` requests
+    in flight, into arrays aligned with `tickers`. `orderBookOrders` lists individual orders, so orders
+    at the same price are summed into a level, and a market is fetched again with more orders while
+    its levels are incomplete. At the `MAX_ORDERS` cap the last level's size is a lower bound. A market
+    whose request failed is left as NaN with a zero timestamp and its exception is listed in `errors`.
+
+    Args:
+        lighter (Lighter): An initialized client.
+        tickers (list, optional): The tickers (or market ids, if `is_index`). Defaults to every market.
+        depth (int, optional): The number of levels per side. Defaults to 1.
+        concurrency (int, optional): The maximum number of requests in flight. Defaults to 32.
+        is_index (bool, optional): Whether `tickers` are market ids. Defaults to False.
+
+    Returns:
+        dict: 'tickers' (list), 'market_id' (n,), 'bid', 'ask', 'bid_size', 'ask_size' (n,) (size summed over the best price's orders),
+            'bid_prices', 'bid_sizes', 'ask_prices', 'ask_sizes' (n, depth), 'timestamp' (n,) in ms
+            when each response arrived, and 'errors' {ticker: exception}.
+    """
+    tickers = list(lighter.ticker_to_idx) if tickers is None else list(tickers)
+    n = len(tickers)
+    market_ids = np.array([ticker if is_index else lighter.ticker_to_idx[ticker] for ticker in tickers], dtype=np.int64)
+    books = {side: np.full((n, depth), np.nan) for side in ('bid_prices', 'bid_sizes', 'ask_prices', 'ask_sizes')}
+    timestamp = np.zeros(n, dtype=np.int64)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(i):
+        limit = min(MAX_ORDERS, depth * 4)
+        while True:
+            async with semaphore:
+                res = await lighter.orderbook_orders(int(market_ids[i]), limit=limit, is_index=True)
+            sides = {key: res.get(key) or [] for key in ('bids', 'asks')}
+            levels = {key: aggregate_levels(orders) for key, orders in sides.items()}
+            #a response cut at `limit` orders may not hold all of its last price's orders
+            if limit >= MAX_ORDERS or all(len(sides[key]) < limit or len(levels[key]) > depth for key in sides):
+                break
+            limit = min(MAX_ORDERS, limit * 4)
+        timestamp[i] = int(time.time() * 1000)
+        for side, key in (('bid', 'bids'), ('ask', 'asks')):
+            side_levels = levels[key][:depth]
+            books[f'{side}_prices'][i, :len(side_levels)] = [price for price, _ in side_levels]
+            books[f'{side}_sizes'][i, :len(side_levels)] = [size for _, size in side_levels]
+
+    results = await asyncio.gather(*[fetch(i) for i in range(n)], return_exceptions=True)
+    errors = {ticker: res for ticker, res in zip(tickers, results) if isinstance(res, Exception)}
+    if errors:
+        logging.warning(f"snapshot failed for {len(errors)} of {n} markets: {list(errors)}")
+    return {
+        'tickers': tickers,
+        'market_id': market_ids,
+        'bid': books['bid_prices'][:, 0],
+        'ask': books['ask_prices'][:, 0],
+        'bid_size': books['bid_sizes'][:, 0],
+        'ask_size': books['ask_sizes'][:, 0],
+        **books,
+        'timestamp': timestamp,
+        'errors': errors,
+    }
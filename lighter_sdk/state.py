@@ -0,0 +1,189 @@
+import asyncio
+import logging
+
+def order_record(order):
+    '''compact local view of an order from the REST or stream payload'''
+    return {
+        'market_id': int(order['market_index']),
+        'order_index': int(order['order_index']),
+        'client_order_index': int(order.get('client_order_index', 0)),
+        'price': float(order['price']),
+        'size': float(order['remaining_base_amount']),
+        'is_ask': bool(order['is_ask']),
+        'status': order.get('status', 'open'),
+    }
+
+def position_record(position):
+    return {
+        'market_id': int(position['market_id']),
+        'position': float(position['position']) * (-1 if int(position.get('sign', 1)) < 0 else 1),
+        'avg_entry_price': float(position.get('avg_entry_price', 0)),
+        'open_order_count': int(position.get('open_order_count', 0)),
+    }
+
+
+class AccountState:
+    """
+    A locally maintained view of the account's open orders and positions. It is seeded from REST,
+    then kept current from our own order acks and the account stream, with periodic REST
+    reconciliation to detect and repair drift. Lookups never touch the network.
+
+    Args:
+        lighter (Lighter): An initialized client.
+        reconcile_interval (float, optional): Seconds between REST reconciliations, None to disable. Defaults to 60.
+    """
+
+    def __init__(self, lighter, reconcile_interval=60):
+        self.lighter = lighter
+        self.reconcile_interval = reconcile_interval
+        self.orders = {}
+        self.by_client_id = {}
+        self.pending = {}
+        self.positions = {}
+        self.drift = 0
+        self.task = None
+
+    def open_orders(self, market_id):
+        """Confirmed and locally acked open orders of a market."""
+        orders = list(self.orders.get(market_id, {}).values())
+        return orders + [order for key, order in self.pending.items() if key[0] == market_id]
+
+    def get_order(self, market_id, client_order_index):
+        key = (market_id, client_order_index)
+        return self.by_client_id.get(key) or self.pending.get(key)
+
+    def find_order(self, market_id, index):
+        """
+        The order a cancel or modify targets. The exchange takes either an order index or a client
+        order index there, so the confirmed orders are searched by order index first, then every
+        order (including pending ones) by client order index.
+        """
+        order = self.orders.get(market_id, {}).get(index)
+        return order if order is not None else self.get_order(market_id, index)
+
+    def position(self, market_id):
+        position = self.positions.get(market_id)
+        return position['position'] if position else 0.
+
+    def on_ack(self, tx_type, kwargs):
+        """Record an order action we sent, before the exchange reports it."""
+        if 'market_index' not in kwargs:
+            #cancel all
+            for order in [o for book in self.orders.values() for o in book.values()] + list(self.pending.values()):
+                order['status'] = 'cancel_pending'
+            return
+        market_id = kwargs['market_index']
+        if 'client_order_index' in kwargs and 'base_amount' in kwargs and 'is_ask' in kwargs:
+            instrument = self.lighter.instruments.get(market_id, is_index=True)
+            self.pending[(market_id, kwargs['client_order_index'])] = {
+                'market_id': market_id,
+                'order_index': None,
+                'client_order_index': kwargs['client_order_index'],
+                'price': kwargs['price'] / instrument.price_scale,
+                'size': kwargs['base_amount'] / instrument.size_scale,
+                'is_ask': bool(kwargs['is_ask']),
+                'status': 'pending',
+            }
+        elif 'order_index' in kwargs:
+            order = self.find_order(market_id, kwargs['order_index'])
+            if order is None:
+                return
+            if 'price' in kwargs:
+                #modify
+                instrument = self.lighter.instruments.get(market_id, is_index=True)
+                order['price'] = kwargs['price'] / instrument.price_scale
+                order['size'] = kwargs['base_amount'] / instrument.size_scale
+            else:
+                order['status'] = 'cancel_pending'
+
+    def apply_order(self, order):
+        record = order_record(order)
+        market_id, index = record['market_id'], record['order_index']
+        client_key = (market_id, record['client_order_index'])
+        self.pending.pop(client_key, None)
+        if record['status'] == 'open' and record['size'] > 0:
+            self.orders.setdefault(market_id, {})[index] = record
+            self.by_client_id[client_key] = record
+        else:
+            self.orders.get(market_id, {}).pop(index, None)
+            if self.by_client_id.get(client_key, {}).get('order_index') == index:
+                del self.by_client_id[client_key]
+
+    def apply_position(self, position):
+        record = position_record(position)
+        self.positions[record['market_id']] = record
+
+    async def fetch(self, market_ids=None):
+        """Fetch positions and active orders over REST. Returns (positions, orders) as local records."""
+        account = (await self.lighter.account(by='index'))['accounts'][0]
+        positions = [position_record(position) for position in account.get('positions', [])]
+        if market_ids is None:
+            market_ids = [p['market_id'] for p in positions if p['open_order_count'] > 0]
+        results = await asyncio.gather(*[
+            self.lighter.account_active_orders(market_id, is_index=True) for market_id in market_ids
+        ])
+        orders = [order for res in results for order in res.get('orders', [])]
+        return positions, orders
+
+    async def seed(self, market_ids=None):
+        positions, orders = await self.fetch(market_ids)
+        self.orders.clear()
+        self.by_client_id.clear()
+        self.pending.clear()
+        self.positions.clear()
+        for position in positions:
+            self.positions[position['market_id']] = position
+        for order in orders:
+            self.apply_order(order)
+
+    async def reconcile(self):
+        """Compare the local view with REST, count drift and adopt the exchange's view."""
+        positions, orders = await self.fetch(list(set(self.orders) | {
+            p['market_id'] for p in self.positions.values() if p['open_order_count'] > 0
+        }))
+        remote_orders = {(int(o['market_index']), int(o['order_index'])) for o in orders}
+        local_orders = {(m, i) for m, book in self.orders.items() for i in book}
+        remote_positions = {p['market_id']: p['position'] for p in positions if p['position']}
+        local_positions = {m: p['position'] for m, p in self.positions.items() if p['position']}
+        if remote_orders != local_orders or remote_positions != local_positions:
+            self.drift += 1
+            logging.warning(
+                f"account state drift: orders +{len(remote_orders - local_orders)} -{len(local_orders - remote_orders)}, "
+                f"positions {local_positions} -> {remote_positions}"
+            )
+            pending = dict(self.pending)
+            self.orders.clear()
+            self.by_client_id.clear()
+            self.positions.clear()
+            for position in positions:
+                self.positions[position['market_id']] = position
+            for order in orders:
+                self.apply_order(order)
+            self.pending.update({k: v for k, v in pending.items() if k not in self.by_client_id})
+
+    async def handle(self, message):
+        """Apply an `account_all` or `account_all_orders` stream message."""
+        positions = message.get('positions') or {}
+        for position in (positions.values() if isinstance(positions, dict) else positions):
+            self.apply_position(position)
+        orders = message.get('orders') or {}
+        for market_orders in (orders.values() if isinstance(orders, dict) else [orders]):
+            for order in market_orders:
+                self.apply_order(order)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logging.warning(f"account state reconciliation failed: {e}")
+
+    def start(self):
+        if self.reconcile_interval and (self.task is None or self.task.done()):
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
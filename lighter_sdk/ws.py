@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import orjson
+
+class WSClient:
+    """
+    An asynchronous websocket client for the exchange stream. Tracks channel subscriptions, replays
+    them on reconnect and dispatches decoded messages to the handler registered for each channel.
+
+    Args:
+        url (str): The websocket url of the stream.
+        reconnect_delay (float, optional): Seconds to wait before reconnecting a dropped stream. Defaults to 1.
+    """
+
+    def __init__(self, url, reconnect_delay=1):
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.subscriptions = {}
+        self.handlers = {}
+        self.ws = None
+        self.task = None
+        self.connected = asyncio.Event()
+        self.shutdown = False
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.shutdown = False
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    @staticmethod
+    def encode(payload):
+        '''callable fields, e.g. an auth token provider, are evaluated at send time so replays stay valid'''
+        return orjson.dumps({k: v() if callable(v) else v for k, v in payload.items()}).decode()
+
+    async def send(self, payload):
+        if self.ws is not None:
+            await self.ws.send(self.encode(payload))
+
+    async def subscribe(self, channel, handler, **kwargs):
+        """
+        Subscribe to a channel, e.g. `order_book/0`.
+
+        Args:
+            channel (str): The channel to subscribe to.
+            handler (callable): A coroutine function receiving every decoded message on the channel.
+            **kwargs: Extra subscription fields, e.g. `auth`. Callables are evaluated on every (re)send.
+        """
+        payload = {'type': 'subscribe', 'channel': channel, **kwargs}
+        self.subscriptions[channel] = payload
+        self.handlers[channel] = handler
+        self.start()
+        await self.send(payload)
+
+    async def unsubscribe(self, channel):
+        self.subscriptions.pop(channel, None)
+        self.handlers.pop(channel, None)
+        await self.send({'type': 'unsubscribe', 'channel': channel})
+
+    async def resubscribe(self, channel):
+        """Unsubscribe and subscribe again to a channel, which makes the server send a fresh snapshot."""
+        payload = self.subscriptions.get(channel)
+        if payload is None:
+            return
+        await self.send({'type': 'unsubscribe', 'channel': channel})
+        await self.send(payload)
+
+    async def run(self):
+        import websockets
+        while not self.shutdown:
+            try:
+                async with websockets.connect(self.url, max_size=None) as ws:
+                    replayed = set()
+                    for channel, payload in list(self.subscriptions.items()):
+                        await ws.send(self.encode(payload))
+                        replayed.add(channel)
+                    self.ws = ws
+                    for channel, payload in list(self.subscriptions.items()):
+                        if channel not in replayed:
+                            await self.send(payload)
+                    self.connected.set()
+                    async for raw in ws:
+                        await self.dispatch(orjson.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"stream {self.url} dropped: {e}")
+            finally:
+                self.ws = None
+                self.connected.clear()
+            if not self.shutdown:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def dispatch(self, message):
+        msg_type = message.get('type')
+        if msg_type == 'ping':
+            await self.send({'type': 'pong'})
+            return
+        channel = message.get('channel')
+        if channel is None:
+            return
+        handler = self.handlers.get(channel.replace(':', '/'))
+        if handler is not None:
+            await handler(message)
+
+    async def close(self):
+        self.shutdown = True
+        if self.ws is not None:
+            await self.ws.close()
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.task = None
@@ -0,0 +1,39 @@
+import asyncio
+
+from lighter_sdk.nonce import NonceManager
+
+
+def counting_fetch(seeds):
+    seeds = iter(seeds)
+
+    async def fetch(account_index, api_key_index):
+        return next(seeds)
+    return fetch
+
+
+def test_late_failure_does_not_resync_again():
+    async def run():
+        nonces = NonceManager(counting_fetch([10, 12, 99]))
+        first, stale = await nonces.reserve(1, 0)
+        second, _ = await nonces.reserve(1, 0)
+        await nonces.resync(1, 0, generation=stale)
+        in_flight, fresh = await nonces.reserve(1, 0)
+        #the late failure of `second` was allocated before the resync, the reseed already covers it
+        await nonces.resync(1, 0, generation=stale)
+        after, _ = await nonces.reserve(1, 0)
+        await nonces.resync(1, 0, generation=fresh)
+        return (first, second, in_flight, after, await nonces.next(1, 0)), stale, fresh
+
+    allocated, stale, fresh = asyncio.run(run())
+    assert allocated == (10, 11, 12, 13, 99)
+    assert fresh == stale + 1
+
+
+def test_concurrent_resyncs_share_one_fetch():
+    async def run():
+        nonces = NonceManager(counting_fetch([1, 5, 50]))
+        _, generation = await nonces.reserve(1, 0, n=3)
+        await asyncio.gather(*[nonces.resync(1, 0, generation=generation) for _ in range(4)])
+        return await nonces.next(1, 0)
+
+    assert asyncio.run(run()) == 5
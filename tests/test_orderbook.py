@@ -0,0 +1,97 @@
+import asyncio
+
+import orjson
+import websockets
+
+from lighter_sdk.ws import WSClient
+from lighter_sdk.orderbook import BookEngine, OrderBook
+
+
+def level(price, size):
+    return {'price': str(price), 'size': str(size)}
+
+
+class StandInStream:
+    """
+    A local stand-in for the order book stream. Every subscribe gets the next snapshot, and the
+    first subscription is followed by the given deltas.
+    """
+
+    def __init__(self, snapshots, deltas):
+        self.snapshots = list(snapshots)
+        self.deltas = deltas
+        self.received = []
+
+    async def handler(self, ws):
+        async for raw in ws:
+            message = orjson.loads(raw)
+            self.received.append(message)
+            if message['type'] != 'subscribe':
+                continue
+            channel = message['channel'].replace('/', ':')
+            await ws.send(orjson.dumps({
+                'type': 'subscribed/order_book',
+                'channel': channel,
+                'order_book': self.snapshots.pop(0),
+            }).decode())
+            deltas, self.deltas = self.deltas, []
+            for delta in deltas:
+                await ws.send(orjson.dumps({'type': 'update/order_book', 'channel': channel, 'order_book': delta}).decode())
+
+
+async def stream_book(stream, until):
+    async with websockets.serve(stream.handler, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        ws = WSClient(url=f'ws://127.0.0.1:{port}', reconnect_delay=0.05)
+        engine = BookEngine(ws)
+        try:
+            await engine.subscribe(0)
+            for _ in range(200):
+                if until(engine):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await ws.close()
+        return engine
+
+
+def test_snapshot_and_deltas():
+    stream = StandInStream(
+        snapshots=[{'bids': [level(99, 1), level(98, 2)], 'asks': [level(101, 1), level(102, 3)], 'nonce': 1}],
+        deltas=[
+            {'bids': [level(99, 0), level(100, 5)], 'asks': [], 'begin_nonce': 1, 'nonce': 2},
+            {'bids': [], 'asks': [level(101, 0)], 'begin_nonce': 2, 'nonce': 3},
+        ],
+    )
+    engine = asyncio.run(stream_book(stream, lambda engine: engine.books[0].nonce == 3))
+    book = engine.books[0]
+    assert book.synced
+    assert book.depth() == {'bids': [(100., 5.), (98., 2.)], 'asks': [(102., 3.)]}
+    assert engine.resyncs == 0
+
+
+def test_gap_resubscribes_and_resyncs():
+    stream = StandInStream(
+        snapshots=[
+            {'bids': [level(99, 1)], 'asks': [level(101, 1)], 'nonce': 1},
+            {'bids': [level(97, 4)], 'asks': [level(103, 4)], 'nonce': 10},
+        ],
+        deltas=[
+            {'bids': [level(99, 2)], 'asks': [], 'begin_nonce': 1, 'nonce': 2},
+            {'bids': [level(50, 1)], 'asks': [], 'begin_nonce': 5, 'nonce': 6},
+        ],
+    )
+    engine = asyncio.run(stream_book(stream, lambda engine: engine.books[0].nonce == 10))
+    book = engine.books[0]
+    assert engine.resyncs == 1
+    assert [message['type'] for message in stream.received] == ['subscribe', 'unsubscribe', 'subscribe']
+    assert book.synced
+    assert book.depth() == {'bids': [(97., 4.)], 'asks': [(103., 4.)]}
+
+
+def test_book_side_ordering():
+    book = OrderBook(0)
+    book.snapshot({'bids': [level(p, 1) for p in (3, 1, 2)], 'asks': [level(p, 1) for p in (6, 4, 5)]})
+    book.update({'bids': [level(2, 0), level(2.5, 7)], 'asks': [level(4, 0)]})
+    assert book.depth(2) == {'bids': [(3., 1.), (2.5, 7.)], 'asks': [(5., 1.), (6., 1.)]}
+    assert book.mid() == 4.
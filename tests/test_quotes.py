@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from benchmarks.bench import make_client
+from benchmarks.mock_server import MockLighterServer
+from lighter_sdk.lighter import BATCH_LIMIT, BatchError
+from lighter_sdk.quotes import QuoteManager
+
+
+def ladders(markets, depth):
+    return {market_id: {
+        'bids': [(100 - i / 100, 1) for i in range(depth)],
+        'asks': [(101 + i / 100, 1) for i in range(depth)],
+    } for market_id in range(markets)}
+
+
+async def quote_through_failed_chunk():
+    server = MockLighterServer(markets=8)
+    lighter = await make_client(await server.start())
+    send_tx_batch, calls = server.routes['/api/v1/sendTxBatch'], []
+
+    def fail_second_chunk(params, form):
+        calls.append(form)
+        if len(calls) == 2:
+            return {'code': 21000, 'message': 'rejected'}
+        return send_tx_batch(params, form)
+
+    server.routes['/api/v1/sendTxBatch'] = fail_second_chunk
+    quotes = QuoteManager(lighter)
+    try:
+        with pytest.raises(BatchError) as failed:
+            await quotes.update(ladders(8, 4), is_index=True)
+        after_failure = {market_id: dict(levels) for market_id, levels in quotes.levels.items()}
+        sent_after_failure = dict(quotes.sent)
+        retry = await quotes.update(ladders(8, 4), is_index=True)
+    finally:
+        await lighter.http_client.cleanup()
+        await server.close()
+    return failed.value, after_failure, sent_after_failure, retry, quotes
+
+
+def test_failed_chunk_rolls_back_only_its_legs():
+    error, after_failure, sent, retry, quotes = asyncio.run(quote_through_failed_chunk())
+    assert len(error.results) == 64
+    assert [result['error'] is None for result in error.results] == [True] * BATCH_LIMIT + [False] * 14
+
+    tracked = [level for levels in after_failure.values() for level in levels.values()]
+    assert len(tracked) == BATCH_LIMIT
+    assert all(level['status'] == 'live' for level in tracked)
+    assert sent['create'] == BATCH_LIMIT
+
+    #only the rolled back levels are quoted again, the accepted ones are not duplicated
+    assert len(retry) == 14
+    assert all(result['action']['action'] == 'create' for result in retry)
+    assert quotes.sent['create'] == 64
+    assert quotes.sent['unchanged'] == BATCH_LIMIT
+    assert sum(len(levels) for levels in quotes.levels.values()) == 64